@@ -1,5 +1,5 @@
 from __future__ import annotations
-import time, random
+import random
 from dataclasses import dataclass
 from typing import List, Dict, Callable
 
@@ -56,6 +56,7 @@ class ConveyorSystem:
     def __init__(self):
         self.mode = "COLLECT"
         self.t = 0.0
+        self.k = 0          # tick sayaci; t = k * DT
         self.next_id = 1
         self.rr = 0
 
@@ -201,7 +202,8 @@ class ConveyorSystem:
                         except Exception: pass
 
     def tick(self):
-        self.t += DT
+        self.k += 1
+        self.t = self.k * DT
         self._spawn()
         self._step_load_loop()
         self._step_belts()
@@ -228,30 +230,58 @@ class ConveyorSystem:
             "done": len(self.done_log),
         }
 
+def _read_keys(loop, keys):
+    # bloklayan tus okuma daemon thread'de; dongu beklemez
+    try:
+        import msvcrt
+        read = msvcrt.getwch
+    except ImportError:
+        import sys as _sys
+        read = lambda: (_sys.stdin.readline() or "q")[:1]
+    while True:
+        ch = read().lower()
+        loop.call_soon_threadsafe(keys.put_nowait, ch)
+        if ch == "q":
+            return
+
+async def _console(sys, keys, stop):
+    while True:
+        ch = await keys.get()
+        if ch == "q":
+            stop.set()
+            return
+        if ch == "r":
+            sys.toggle_mode()
+            print(f"-> Mode: {sys.mode}")
+
+async def _main(sys):
+    # mutlak son tarihler: j. tick t0 + j*DT'de biter, uyku hatasi birikmez
+    import asyncio, threading
+    loop = asyncio.get_running_loop()
+    keys, stop = asyncio.Queue(), asyncio.Event()
+    threading.Thread(target=_read_keys, args=(loop, keys), daemon=True).start()
+    console = asyncio.create_task(_console(sys, keys, stop))
+    t0, j = loop.time(), 0
+    while not stop.is_set():
+        sys.tick()
+        if sys.k % FPS == 0:
+            print(sys.snapshot())
+        j += 1
+        lag = loop.time() - (t0 + j * DT)
+        if lag > 1.0:
+            print(f"(Uyarı) {lag:.2f} sn geride, saat yeniden kuruldu")
+            t0, j = loop.time(), 0
+        await asyncio.sleep(max(0.0, -lag))
+    console.cancel()
+
 if __name__ == "__main__":
+    import asyncio
     sys = ConveyorSystem()
     sys.on_unloaded = lambda iid, at, ts: None 
 
     print("Başladı. R: DRAIN/COLLECT toggle, Q: çıkış")
     try:
-        import msvcrt 
-        while True:
-            start = time.time()
-
-            if msvcrt.kbhit():
-                ch = msvcrt.getwch()
-                if ch in ("q","Q"):
-                    break
-                if ch in ("r","R"):
-                    sys.toggle_mode()
-                    print(f"-> Mode: {sys.mode}")
-
-            sys.tick()
-            if int(sys.t) != int(sys.t - DT):
-                print(sys.snapshot())
-
-            elapsed = time.time() - start
-            time.sleep(max(0.0, DT - elapsed))
+        asyncio.run(_main(sys))
     except KeyboardInterrupt:
         pass
     print("Durdu.")
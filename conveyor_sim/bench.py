@@ -0,0 +1,325 @@
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Sequence
+
+# Tick maliyeti olcumleri. Topoloji surec basina yuklendigi icin (config
+# import aninda okur) her topoloji ayri bir alt surecte olculur.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+TOPOLOGIES = [os.path.join(HERE, "topologies", f) for f in ("default.json", "site2.json")]
+
+
+def tick_cost(n_items: int, ticks: int = 300, warmup: int = 600, seed: int = 1) -> Dict[str, object]:
+    import logsink
+    logsink.LOG.set_level(logsink.OFF)
+    from config import TOPOLOGY
+    from system import ConveyorSystem
+    s = ConveyorSystem(seed=seed)
+    stations = sorted(TOPOLOGY.stations)
+    for i, st in enumerate(stations):
+        k = n_items // len(stations) + (i < n_items % len(stations))
+        s.add_items_from_barcodes((f"BN{st}-{j}" for j in range(k)), st)
+    for _ in range(warmup):
+        s.tick()
+    t0 = time.perf_counter()
+    for _ in range(ticks):
+        s.tick()
+    dt = time.perf_counter() - t0
+    return {
+        "topology": TOPOLOGY.name, "belts": TOPOLOGY.n_belts, "loops": len(TOPOLOGY.loops),
+        "items": n_items, "us_per_tick": 1e6 * dt / ticks, "snapshot": s.snapshot(),
+    }
+
+
+def topology_scaling(paths: Sequence[str] = TOPOLOGIES, items: Sequence[int] = (0, 1000, 5000),
+                     ticks: int = 300) -> List[Dict[str, object]]:
+    out = []
+    for path in paths:
+        env = dict(os.environ, CONVEYOR_TOPOLOGY=path)
+        for n in items:
+            res = subprocess.run([sys.executable, __file__, "--_tick", str(n), str(ticks)],
+                                 env=env, cwd=HERE, capture_output=True, text=True, check=True)
+            out.append(json.loads(res.stdout))
+    return out
+
+
+# Motor paketi: uc motor (conveyor_sim, kokteki conveyor_core ve ayrik
+# convoy) ayni sabit is yukleriyle, artan item sayilarinda kosulur. Her
+# durum ayri alt surecte: once zamanlama (izlemesiz), sonra ayni durum
+# tracemalloc altinda tepe bellek icin yeniden kurulur. item-tick = her
+# tick'in basinda sistemde olan item sayisinin toplami.
+
+WORKLOADS = ("empty", "collect", "hang", "drain")
+SUITE_ENGINES = ("sim", "sim-numpy", "sim-sharded", "core", "convoy")
+DEFAULT_ENGINES = ("sim", "core", "convoy")
+
+
+class _Sim:
+    workloads = WORKLOADS
+
+    def __init__(self, engine: str, n: int, seed: int):
+        import logsink
+        logsink.LOG.set_level(logsink.OFF)
+        from config import TOPOLOGY, LOAD_LOOP_LEN_M, SPEED_COLLECT, DT, HANG_DURATION_S
+        from system import ConveyorSystem
+        self.s = ConveyorSystem(engine.partition("-")[2] or "list", seed=seed)
+        self.warmup = int(round(LOAD_LOOP_LEN_M / SPEED_COLLECT / DT))
+        self.hang_s = HANG_DURATION_S
+        self.dt = DT
+        stations = sorted(TOPOLOGY.stations)
+        for i, st in enumerate(stations):
+            k = n // len(stations) + (i < n % len(stations))
+            self.s.add_items_from_barcodes((f"BN{st}-{j}" for j in range(k)), st)
+
+    def tick(self):
+        self.s.tick()
+
+    def live(self) -> int:
+        return self.s.next_id - 1 - len(self.s.done_log)
+
+    def hang(self, seconds: float):
+        self.s.set_mode("HANG")
+        self.s.advance(seconds)
+
+    def drain(self):
+        self.s.toggle_mode()
+
+    def close(self):
+        if hasattr(self.s, "close"):
+            self.s.close()
+
+
+class _Core:
+    # HANG modu yok; istasyon uretimi kapali, item'lar dongude esit aralikli
+    workloads = ("empty", "collect", "drain")
+
+    def __init__(self, engine: str, n: int, seed: int):
+        import random
+        import conveyor_core as cc
+        random.seed(seed)
+        s = self.s = cc.ConveyorSystem()
+        s._spawn = lambda: None
+        self.warmup = int(round(cc.LOAD_LOOP_LEN_M / cc.SPEED_COLLECT / cc.DT))
+        self.dt = cc.DT
+        sp = s._speed_for("LOAD")
+        for i in range(n):
+            s.load_loop.append(cc.Moving(s.next_id, "LOAD", i * cc.LOAD_LOOP_LEN_M / max(n, 1),
+                                         cc.LOAD_LOOP_LEN_M, sp, wrap=True))
+            s.next_id += 1
+
+    def tick(self):
+        self.s.tick()
+
+    def live(self) -> int:
+        return self.s.next_id - 1 - len(self.s.done_log)
+
+    def drain(self):
+        self.s.set_mode("DRAIN")
+
+    def close(self):
+        pass
+
+
+class _Convoy:
+    # mod yok: item'lar uretildikleri anda bosaltmaya akar; "collect" akan hat
+    workloads = ("empty", "collect", "drain")
+    warmup = 0
+
+    def __init__(self, engine: str, n: int, seed: int):
+        import convoy
+        self.s = convoy.ConveyorSystem()
+        self.dt = convoy.DT
+        k = convoy.STATION_COUNT
+        self.s.add_items([n // k + (i < n % k) for i in range(k)])
+        self.idle = (0,) * k
+
+    def tick(self):
+        self.s.tick(self.idle)
+
+    def live(self) -> int:
+        s = self.s
+        return s._item_id_seq - 1 - len(s.unload1.unloaded_log) - len(s.unload2.unloaded_log)
+
+    def drain(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _engine(name: str, n: int, seed: int):
+    if name.startswith("sim"):
+        return _Sim(name, n, seed)
+    if ROOT not in sys.path:
+        sys.path.append(ROOT)
+    return (_Core if name == "core" else _Convoy)(name, n, seed)
+
+
+def _drive(name: str, workload: str, n: int, ticks: int, seed: int, hang_s: Optional[float]):
+    # olculen bolum: (tick sayisi, item-tick, sure sn)
+    e = _engine(name, n, seed)
+    try:
+        for _ in range(e.warmup if workload != "empty" else 0):
+            e.tick()
+        if workload == "hang":
+            seconds = e.hang_s if hang_s is None else hang_s
+            k = int(round(seconds / e.dt))
+            live = e.live()
+            t0 = time.perf_counter()
+            e.hang(seconds)
+            return k, live * k, time.perf_counter() - t0
+        if workload == "drain":
+            e.drain()
+        done = 0
+        item_ticks = 0
+        dt = 0.0
+        while done < ticks:
+            live = e.live()
+            if workload == "drain" and not live:
+                break
+            t0 = time.perf_counter()
+            e.tick()
+            dt += time.perf_counter() - t0
+            item_ticks += live
+            done += 1
+        return done, item_ticks, dt
+    finally:
+        e.close()
+
+
+def run_case(engine: str, workload: str, n: int, ticks: int = 1000, seed: int = 1,
+             hang_s: Optional[float] = None, memory: bool = True) -> Dict[str, object]:
+    k, item_ticks, dt = _drive(engine, workload, n, ticks, seed, hang_s)
+    row = {
+        "engine": engine, "workload": workload, "items": n, "ticks": k, "seconds": dt,
+        "ticks_per_s": k / dt if dt else None,
+        "us_per_tick": 1e6 * dt / k if k else None,
+        "us_per_item_tick": 1e6 * dt / item_ticks if item_ticks else None,
+        "peak_kb": None,
+    }
+    if memory:
+        tracemalloc.start()
+        try:
+            _drive(engine, workload, n, ticks, seed, hang_s)
+            row["peak_kb"] = tracemalloc.get_traced_memory()[1] / 1024
+        finally:
+            tracemalloc.stop()
+    return row
+
+
+def suite(engines: Sequence[str] = DEFAULT_ENGINES, workloads: Sequence[str] = WORKLOADS,
+          items: Sequence[int] = (100, 1000, 5000), ticks: int = 1000, seed: int = 1,
+          hang_s: Optional[float] = None, memory: bool = True) -> Dict[str, object]:
+    rows = []
+    for engine in engines:
+        supported = (_Sim if engine.startswith("sim") else _Core if engine == "core" else _Convoy).workloads
+        for w in workloads:
+            if w not in supported:
+                continue
+            for n in ((0,) if w == "empty" else items):
+                cmd = [sys.executable, __file__, "--_case", engine, w, str(n), str(ticks), str(seed)]
+                if hang_s is not None:
+                    cmd += ["--hang-s", str(hang_s)]
+                if not memory:
+                    cmd.append("--no-mem")
+                res = subprocess.run(cmd, cwd=HERE, capture_output=True, text=True, check=True)
+                rows.append(json.loads(res.stdout))
+    return {"meta": _meta(ticks, seed, hang_s), "results": rows}
+
+
+def _meta(ticks: int, seed: int, hang_s: Optional[float]) -> Dict[str, object]:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        rev = None
+    return {"rev": rev, "python": platform.python_version(), "machine": platform.machine(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"), "ticks": ticks, "seed": seed, "hang_s": hang_s}
+
+
+def compare(base: Dict[str, object], cur: Dict[str, object], tolerance: float = 0.2) -> List[str]:
+    # us_per_tick ve peak_kb tabanin (1 + tolerance) katini asarsa gerileme
+    key = lambda r: (r["engine"], r["workload"], r["items"])
+    old = {key(r): r for r in base["results"]}
+    out = []
+    for r in cur["results"]:
+        b = old.get(key(r))
+        if b is None:
+            continue
+        for f in ("us_per_tick", "peak_kb"):
+            if b[f] and r[f] and r[f] > b[f] * (1 + tolerance):
+                out.append(f"{r['engine']}/{r['workload']}/{r['items']}: {f} {b[f]:.1f} -> {r[f]:.1f}"
+                           f" (+{100 * (r[f] / b[f] - 1):.0f}%)")
+    return out
+
+
+def _print_suite(rows: List[Dict[str, object]]):
+    fmt = lambda v, p: "-" if v is None else f"{v:.{p}f}"
+    print(f"{'engine':>11} {'workload':>8} {'items':>6} {'ticks':>7} {'ticks/s':>10} {'us/item-tick':>12} {'peak KB':>9}")
+    for r in rows:
+        print(f"{r['engine']:>11} {r['workload']:>8} {r['items']:>6} {r['ticks']:>7}"
+              f" {fmt(r['ticks_per_s'], 0):>10} {fmt(r['us_per_item_tick'], 4):>12} {fmt(r['peak_kb'], 0):>9}")
+
+
+def _suite_main(argv: List[str]):
+    import argparse
+    ap = argparse.ArgumentParser(prog="bench.py suite", description="Motor karsilastirma paketi")
+    ap.add_argument("--engine", nargs="*", choices=SUITE_ENGINES, default=list(DEFAULT_ENGINES))
+    ap.add_argument("--workload", nargs="*", choices=WORKLOADS, default=list(WORKLOADS))
+    ap.add_argument("--items", type=int, nargs="*", default=[100, 1000, 5000])
+    ap.add_argument("--ticks", type=int, default=1000, help="collect/empty tick sayisi, drain ust siniri")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--hang-s", type=float, default=None, help="varsayilan HANG_DURATION_S (12 saat)")
+    ap.add_argument("--no-mem", action="store_true", help="tracemalloc gecisini atla")
+    ap.add_argument("--out", help="sonuclari JSON olarak yaz")
+    ap.add_argument("--compare", help="onceki JSON; gerileme varsa cikis kodu 1")
+    ap.add_argument("--tolerance", type=float, default=0.2)
+    args = ap.parse_args(argv)
+    res = suite(args.engine, args.workload, args.items, args.ticks, args.seed, args.hang_s, not args.no_mem)
+    _print_suite(res["results"])
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(res, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            bad = compare(json.load(f), res, args.tolerance)
+        for line in bad:
+            print("[GERILEME]", line)
+        sys.exit(1 if bad else 0)
+
+
+if __name__ == "__main__":
+    import argparse
+    if sys.argv[1:2] == ["suite"]:
+        _suite_main(sys.argv[2:])
+        sys.exit(0)
+    ap = argparse.ArgumentParser(description="Topoloji boyutuna karsi tick maliyeti (motor paketi: bench.py suite)")
+    ap.add_argument("--topology", nargs="*", default=TOPOLOGIES)
+    ap.add_argument("--items", type=int, nargs="*", default=[0, 1000, 5000])
+    ap.add_argument("--ticks", type=int, default=300)
+    ap.add_argument("--json", action="store_true")
+    ap.add_argument("--_tick", nargs=2, type=int, help=argparse.SUPPRESS)
+    ap.add_argument("--_case", nargs=5, help=argparse.SUPPRESS)
+    ap.add_argument("--hang-s", type=float, default=None, help=argparse.SUPPRESS)
+    ap.add_argument("--no-mem", action="store_true", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args._tick:
+        print(json.dumps(tick_cost(*args._tick)))
+        sys.exit(0)
+    if args._case:
+        engine, w, n, ticks, seed = args._case
+        print(json.dumps(run_case(engine, w, int(n), int(ticks), int(seed), args.hang_s, not args.no_mem)))
+        sys.exit(0)
+    rows = topology_scaling(args.topology, args.items, args.ticks)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+    else:
+        for r in rows:
+            print(f"{r['topology']:>10} belts={r['belts']:>4} loops={r['loops']} items={r['items']:>6}"
+                  f"  {r['us_per_tick']:9.1f} us/tick")
@@ -0,0 +1,64 @@
+import io
+import pickle
+import struct
+from array import array
+
+from config import DT
+from system import ConveyorSystem
+
+# Ikili checkpoint: MAGIC + surum + pickle(protocol 5). Segmentler ve item
+# tablolari ham sutun byte'lari olarak yazilir, float'lar birebir geri gelir.
+# on_unloaded gibi geri cagrilar kaydedilmez. Durum yalnizca yerlesik
+# degerlerdir (sayi, str, bytes, liste, sozluk, demet, kume); okurken hicbir
+# global yuklenmez, guvenilmeyen dosya kod calistiramaz.
+
+MAGIC = b"CVCK"
+VERSION = 1
+_HEADER = struct.Struct("<4sH")
+
+SCALARS = (
+    "t", "k", "rr", "feed_rr", "next_id", "mode", "hang_started_at", "drain_started_at",
+    "_ignore_gaps", "_drain_speed_belts", "_drain_speed_line2", "_belt_gap",
+    "unload_window_s", "_unload_buf", "_unload_k0",
+)
+
+
+class _Unpickler(pickle.Unpickler):
+    def find_class(self, module: str, name: str):
+        raise ValueError(f"checkpoint: izin verilmeyen nesne {module}.{name}")
+
+
+def dump(sys: ConveyorSystem) -> bytes:
+    state = {
+        "engine": sys.engine,
+        "scalars": {k: getattr(sys, k) for k in SCALARS},
+        "hanged": array("q", sys.hanged_ids).tobytes(),
+        "done": array("q", sys.done_log).tobytes(),
+        "meta": sys.meta.get_state(),
+        "rng": sys.rng.get_state(),
+        "segments": sys._segments_state(),
+    }
+    return _HEADER.pack(MAGIC, VERSION) + pickle.dumps(state, protocol=5)
+
+
+def load(data: bytes) -> ConveyorSystem:
+    magic, version = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("checkpoint degil")
+    if version != VERSION:
+        raise ValueError(f"desteklenmeyen checkpoint surumu: {version}")
+    state = _Unpickler(io.BytesIO(memoryview(data)[_HEADER.size:])).load()
+    sys = ConveyorSystem(state["engine"])
+    for k, v in state["scalars"].items():
+        setattr(sys, k, v)
+    if "k" not in state["scalars"]:
+        sys.k = round(sys.t / DT)
+    if "feed_rr" not in state["scalars"]:
+        # eski kayitlarda besleme ve U1/U2 sirasi tek sayacti
+        sys.feed_rr = [sys.rr] * len(sys.load_loops)
+    sys.hanged_ids = set(array("q", state["hanged"]))
+    sys.done_log = array("q", state["done"]).tolist()
+    sys.meta.set_state(state["meta"])
+    sys.rng.set_state(state["rng"])
+    sys._set_segments_state(state["segments"])
+    return sys
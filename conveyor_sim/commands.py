@@ -0,0 +1,112 @@
+from queue import Empty, SimpleQueue
+from typing import Iterable, List, Optional, Tuple
+
+# G/C thread'leri (okuyucu, konsol, OPC UA koprusu) ConveyorSystem'e dokunmaz:
+# komutu kuyruga atar, tick() adimin basinda kuyrugu bosaltir. Uygulama
+# sirasi kuyruga giris sirasidir. Gunluk istege baglidir (journal=True):
+# her komut (tick, ad, argumanlar) olarak yazilir, ayni seed ile replay()
+# kosuyu birebir tekrarlar. Gunluk sinirsiz buyur (add_many barkod listeleri
+# dahil); uzun sureli kosularda acik birakilmamali.
+
+COMMANDS = {
+    "add": "add_item_from_barcode",
+    "add_many": "add_items_from_barcodes",
+    "toggle": "toggle_mode",
+    "pick": "pick_and_hang",
+    "hang": "_enter_hang",
+    "set_mode": "set_mode",
+    "key": None,                # konsol tusu: apply_key (sistem metodu degil)
+}
+
+# Konsol tuslari: etkilesimli konsol ("key" komutuyla kuyruktan) ve betikli
+# kosu ayni apply_key'i cagirir; geri bildirim ve barkod bicimi tek yerde
+KEYS = ("r", "p", "h", "b")
+
+Entry = Tuple[int, str, tuple]
+
+
+class CommandQueue:
+    def __init__(self, journal: bool = False):
+        self._q: SimpleQueue = SimpleQueue()
+        self.journal: Optional[List[Entry]] = [] if journal else None
+        self.applied = 0
+        self.failed = 0
+
+    def submit(self, name: str, *args):
+        # herhangi bir thread'den; asla bloklamaz
+        if name not in COMMANDS:
+            raise ValueError(f"bilinmeyen komut: {name!r}")
+        if name == "key" and args[0] not in KEYS:
+            raise ValueError(f"bilinmeyen tus: {args[0]!r}")
+        if name == "add_many":
+            args = (list(args[0]),) + args[1:]   # ureticinin iterator'u burada tuketilir
+        self._q.put((name, args))
+
+    def pending(self) -> int:
+        return self._q.qsize()
+
+    def drain(self, sys):
+        # yalnizca simulasyon thread'i; bosaltma sirasinda gelenler sonraki tick'e kalir
+        k = sys.k
+        for _ in range(self._q.qsize()):
+            try:
+                name, args = self._q.get_nowait()
+            except Empty:
+                return
+            if self.journal is not None:
+                self.journal.append((k, name, args))
+            if apply(sys, name, args):
+                self.applied += 1
+            else:
+                self.failed += 1
+
+
+def apply(sys, name: str, args: tuple) -> bool:
+    try:
+        method = COMMANDS[name]
+        if method is None:
+            ch, station = args
+            apply_key(sys, ch, station=station)
+        else:
+            getattr(sys, method)(*args)
+    except Exception as e:
+        sys.log.error("command_failed", "[HATA] komut {name}{args}: {err}", name=name, args=args, err=repr(e))
+        return False
+    if sys.log.is_debug:
+        sys.log.debug("command", name=name, args=args, t=sys.t)
+    return True
+
+
+def apply_key(sys, ch: str, kpi=None, station: int = 1):
+    # barkod uygulama aninda uretilir: kuyrukta bekleyen tuslar ayni kodu almaz
+    if ch == "r":
+        if kpi:
+            kpi.leaving_mode()
+        sys.toggle_mode()
+        sys.log.info("mode", "-> Mode: {mode}", mode=sys.mode)
+    elif ch == "p":
+        sys.pick_and_hang()
+        sys.log.info("pick_and_hang", "-> P: LOAD -> (L1/BELT/LOAD rastgele) taşı ve dondur")
+    elif ch == "h":
+        if kpi:
+            kpi.leaving_mode()
+        sys._enter_hang()
+        sys.log.info("mode", "-> Mode: HANG (askıda bekleme)", mode=sys.mode)
+    elif ch == "b":
+        code = f"BC{sys.next_id:04d}"
+        if kpi:
+            kpi.add_item(code, station=station)
+        else:
+            sys.add_item_from_barcode(code, station=station)
+
+
+def replay(sys, journal: Iterable[Entry], ticks: int):
+    # gunlukteki komutlari kaydedildikleri tick'lerin basinda uygula
+    todo = sorted(journal, key=lambda e: e[0])
+    i = 0
+    for _ in range(ticks):
+        k = sys.k
+        while i < len(todo) and todo[i][0] <= k:
+            apply(sys, todo[i][1], todo[i][2])
+            i += 1
+        sys.tick()
@@ -1,4 +1,11 @@
-BELTS_R, BELTS_C = 7, 6
+import os
+
+from topology import load_topology
+
+# yerlesim (bantlar, donguler, hat uzunluklari) topoloji dosyasindan
+TOPOLOGY = load_topology(os.environ.get("CONVEYOR_TOPOLOGY"))
+
+BELTS_R, BELTS_C = TOPOLOGY.rows, TOPOLOGY.cols
 FPS = 10
 DT = 1.0 / FPS
 
@@ -6,15 +13,24 @@ SPEED_COLLECT = 1.0
 SPEED_DRAIN = 2.0
 SPEED_LINE2_DRAIN = 4.0
 
-LOAD_LOOP_LEN_M = 120.0
-SW_POS_M = 60.0
-STATION_POS_M = {1: 10.0, 2: 30.0, 3: 80.0, 4: 100.0}
+# ilk yukleme dongusu (tek donguluk motorlar bunlari kullanir)
+LOAD_LOOP_LEN_M = TOPOLOGY.loops[0].length
+SW_POS_M = TOPOLOGY.loops[0].switch_pos
+STATION_POS_M = {st: pos for st, (i, pos) in TOPOLOGY.stations.items() if i == 0}
 
-BELT_LEN_M = 8.0
-LINE2_LEN_M = 30.0
-UNL_LEN_M = 15.0
+BELT_LEN_M = TOPOLOGY.belt_len_m
+LINE2_LEN_M = TOPOLOGY.line2_m
+UNL_LEN_M = TOPOLOGY.unload_m
 
 SPAWN_RATES = (1.0, 1.0, 1.0, 1.0)
 
 HANG_DURATION_S = 12 * 60 *60
 DRAIN_WINDOW_S = 15 * 60
+
+# segment kimlikleri: bant no = segment no (1..BELTS_R*BELTS_C), digerleri sonrasinda
+SEG_LOAD = 0
+SEG_L1 = TOPOLOGY.seg_l1
+SEG_L2 = TOPOLOGY.seg_l2
+SEG_U1 = TOPOLOGY.seg_u1
+SEG_U2 = TOPOLOGY.seg_u2
+SEG_LOADS = TOPOLOGY.load_segs
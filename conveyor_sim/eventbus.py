@@ -0,0 +1,93 @@
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from moving import seg_name
+
+# Gecis olay yolu: tek yazar (tick thread'i) onceden ayrilmis sabit
+# kapasiteli halka sutunlarina yazar; her okuyucu kendi imleciyle kendi
+# hizinda okur. Yazar okuyucuyu beklemez: geride kalan okuyucu ustune
+# yazilan kayitlari kaybeder ve 'lost' sayacinda gorur.
+
+EV_LOAD_BELT, EV_BELT_L2, EV_L2_UNL, EV_UNLOAD, EV_HANG, EV_LIFO, EV_MODE = range(1, 8)
+KIND_NAMES = {
+    EV_LOAD_BELT: "load_belt", EV_BELT_L2: "belt_l2", EV_L2_UNL: "l2_unl",
+    EV_UNLOAD: "unload", EV_HANG: "hang", EV_LIFO: "lifo", EV_MODE: "mode",
+}
+MODES = ("COLLECT", "DRAIN", "HANG")
+SEG_DONE = -1
+
+# (seq, kind, t, item, src, dst); EV_MODE'da item=0, src/dst = MODES indeksi
+Record = Tuple[int, int, float, int, int, int]
+
+
+class EventBus:
+    def __init__(self, capacity: int = 1 << 16):
+        self.cap = capacity
+        self.head = 0                   # simdiye kadar yazilan kayit sayisi
+        self.kind = array("b", bytes(capacity))
+        self.t = array("d", bytes(8 * capacity))
+        self.item = array("q", bytes(8 * capacity))
+        self.src = array("h", bytes(2 * capacity))
+        self.dst = array("h", bytes(2 * capacity))
+
+    def emit(self, kind: int, t: float, item: int, src: int, dst: int):
+        i = self.head % self.cap
+        self.kind[i] = kind
+        self.t[i] = t
+        self.item[i] = item
+        self.src[i] = src
+        self.dst[i] = dst
+        self.head += 1
+
+    def emit_many(self, kind: int, t: float, items, src, dst):
+        # numpy motoru icin: items/src/dst ayni uzunlukta diziler ya da src/dst sabit
+        n = len(items)
+        src = src if hasattr(src, "__len__") else [src] * n
+        dst = dst if hasattr(dst, "__len__") else [dst] * n
+        for iid, s, d in zip(items, src, dst):
+            self.emit(kind, t, int(iid), int(s), int(d))
+
+    def emit_mode(self, t: float, old: str, new: str):
+        self.emit(EV_MODE, t, 0, MODES.index(old), MODES.index(new))
+
+    def reader(self, from_oldest: bool = False) -> "BusReader":
+        return BusReader(self, from_oldest)
+
+
+class BusReader:
+    def __init__(self, bus: EventBus, from_oldest: bool = False):
+        self.bus = bus
+        self.pos = max(0, bus.head - bus.cap) if from_oldest else bus.head
+        self.lost = 0
+
+    def pending(self) -> int:
+        return self.bus.head - self.pos
+
+    def poll(self, limit: Optional[int] = None) -> List[Record]:
+        bus = self.bus
+        cap = bus.cap
+        head = bus.head
+        start = max(self.pos, head - cap)
+        end = head if limit is None else min(head, start + limit)
+        out = []
+        for seq in range(start, end):
+            i = seq % cap
+            out.append((seq, bus.kind[i], bus.t[i], bus.item[i], bus.src[i], bus.dst[i]))
+        # okurken yazar tur attiysa ustune yazilmis olanlari at (+1: yazimi suren slot)
+        oldest = bus.head + 1 - cap
+        if oldest > start:
+            out = out[oldest - start:]
+            start = oldest
+        self.lost += start - self.pos
+        self.pos = max(end, start)
+        return out
+
+
+def describe(rec: Record) -> Dict[str, object]:
+    seq, kind, t, item, src, dst = rec
+    if kind == EV_MODE:
+        return {"seq": seq, "kind": "mode", "t": t, "from": MODES[src], "to": MODES[dst]}
+    return {
+        "seq": seq, "kind": KIND_NAMES[kind], "t": t, "item": item,
+        "from": seg_name(src), "to": "DONE" if dst == SEG_DONE else seg_name(dst),
+    }
@@ -0,0 +1,279 @@
+import heapq
+from itertools import count, islice
+from math import ceil
+from typing import Dict, List, Optional, Tuple
+
+from config import (
+    BELTS_R, BELTS_C, DT,
+    BELT_LEN_M, LINE2_LEN_M, UNL_LEN_M,
+    SEG_LOAD, SEG_L2, SEG_U1, SEG_U2
+)
+from eventbus import EV_LOAD_BELT, EV_BELT_L2, EV_L2_UNL, EV_HANG
+from moving import Moving
+from segments import BeltQueue, FifoLine, LoadLoop
+from system import ConveyorSystem, SERP_ORDER
+
+N_BELTS = BELTS_R * BELTS_C
+
+# Olaylar tick izgarasina oturtulur: j. tick'te olan gecis, tick motorunun
+# j. tick()'inde yaptigi gecisle ayni sirada islenir.
+ST_LOAD, ST_BELT, ST_L2, ST_UNL = 0, 1, 2, 3
+
+
+def ticks_to_done(length: float, pos: float, d: float) -> int:
+    if d <= 0:
+        return 1 << 62
+    return max(1, ceil((length - 1e-9 - pos) / d))
+
+
+def belt_steps(seg: BeltQueue, k: int, d: float, gap: float):
+    # COLLECT/HANG: bosaltma yok, bosluk kurali var; k adim kapali formda
+    if k <= 0 or not seg:
+        return
+    prev = 0.0
+    for i, m in enumerate(seg):
+        p = m.pos + k * d
+        if i == 0:
+            m.pos = min(p, BELT_LEN_M)
+        else:
+            m.pos = max(0.0, min(p, prev - gap, BELT_LEN_M))
+        prev = m.pos
+
+
+def loop_crossings(loop: LoadLoop, d: float, n: int) -> List[Tuple]:
+    # n tick icinde swapper'i gececek item'lar: (tick, parca, r, seq, item);
+    # siralama tick icinde _step_load_loop'un varis sirasiyla aynidir
+    ph = loop.phase
+    ph.set_step(d)
+    out = []
+    if d <= 0:
+        return out
+    for r, seq, m in loop.entries():
+        j = ph.crossing_step(r)
+        if j <= n:
+            lo, hi = ph.window(j)
+            out.append((j, 0 if lo <= hi or r >= lo else 1, r, seq, m))
+    return out
+
+
+def loop_finish(loop: LoadLoop, sp: float, n: int):
+    # gecen item'lar yerinde yeniden etiketlendi; dongude kalan kayitlarini at
+    loop.drop(lambda m: m.seg != SEG_LOAD)
+    loop.speed = sp
+    loop.phase.set_step(sp * DT)
+    loop.phase.steps += n
+
+
+def run_events(sys: ConveyorSystem, seconds: float):
+    n = int(round(seconds / DT))
+    if n <= 0:
+        return
+    k0 = sys.k
+    if sys.mode == "DRAIN":
+        k = drain_horizon(sys, n)
+        if k > 0:
+            sys._drain_speed_belts, sys._drain_speed_line2 = sys._drain_speeds_for(0.0, 1.0)
+            _run_drain(sys, k, k0)
+            sys._at_tick(k0 + k)
+        # hizlar yeniden ayarlanmaya basladiysa kalan sure tick tick
+        for _ in range(n - k):
+            sys.tick()
+        return
+    _run_loop(sys, n, k0)
+    sys._at_tick(k0 + n)
+
+
+def drain_horizon(sys: ConveyorSystem, n: int) -> int:
+    # _retune_drain hizlari taban degerlerde kaldigi surece olay motoru gecerli;
+    # en kotu mesafe DRAIN boyunca artmaz, bu yuzden baslangictaki deger yeterli
+    worst = sys._worst_remaining(parked=False)
+    floor = sys._drain_speeds_for(0.0, 1.0)
+    k0 = sys.k
+
+    def ok(k: int) -> bool:
+        sys._at_tick(k0 + k)
+        try:
+            return sys._drain_speeds_for(worst, sys._drain_window_left()) == floor
+        finally:
+            sys._at_tick(k0)
+
+    if ok(n):
+        return n
+    lo, hi = 0, n
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if ok(mid):
+            lo = mid
+        else:
+            hi = mid
+    return max(0, lo - 1)
+
+
+def _run_loop(sys: ConveyorSystem, n: int, k0: int):
+    loop = sys.load_loop
+    sp = sys._speed_for("LOAD") or 0.0
+    events = loop_crossings(loop, sp * DT, n)
+    heapq.heapify(events)
+
+    db = (sys._speed_for("B") or 0.0) * DT
+    gap = sys._belt_gap
+    upto: Dict[int, int] = {}
+
+    def advance_belt(b: int, j: int):
+        belt_steps(sys.belts[b], j - upto.get(b, 0), db, gap)
+        upto[b] = j
+
+    while events:
+        j, _, _, _, m = heapq.heappop(events)
+        sys._at_tick(k0 + j)
+        if sys.mode == "HANG":
+            b = sys.rng.belt.one()
+            pos = sys.rng.pos.one() * BELT_LEN_M
+            advance_belt(b, j - 1)
+            sys.belts[b].push(sys._transfer(m, b, pos, 0.0, EV_HANG))
+            sys.hanged_ids.add(m.id)
+        else:
+            b = SERP_ORDER[sys.feed_rr[0] % N_BELTS]
+            sys.feed_rr[0] += 1
+            advance_belt(b, j - 1)
+            sys.belts[b].push(sys._transfer(m, b, 0.0, sys._speed_for("B"), EV_LOAD_BELT))
+    for b in sys.belts:
+        advance_belt(b, n)
+    loop_finish(loop, sp, n)
+
+
+def _run_drain(sys: ConveyorSystem, n: int, k0: int):
+    loop_finish(sys.load_loop, sys._speed_for("LOAD") or 0.0, n)
+    db = (sys._speed_for("B") or 0.0) * DT
+    d2 = sys._speed_for("L2") * DT
+    du = {"U1": sys._speed_for("U1") * DT, "U2": sys._speed_for("U2") * DT}
+    # item'lar yerinde yeniden etiketlenir; hatlar sonda m.seg'e gore yeniden kurulur
+    lines = {"L2": list(sys.line2), "U1": list(sys.unl1), "U2": list(sys.unl2)}
+    seg_of = {"L2": SEG_L2, "U1": SEG_U1, "U2": SEG_U2}
+    heap: List[Tuple] = []
+    seq = count()
+    # nesne -> (baslangic tick'i, baslangic konumu); konum = pos0 + (tick - tick0) * d
+    start: Dict[int, Tuple[int, float]] = {}
+    done = set()
+
+    for rank, b in enumerate(SERP_ORDER):
+        for m in sys.belts[b]:
+            j = ticks_to_done(BELT_LEN_M, m.pos, db)
+            if j <= n:
+                heapq.heappush(heap, (j, ST_BELT, rank, next(seq), m))
+    for m in lines["L2"]:
+        start[id(m)] = (0, m.pos)
+        j = ticks_to_done(LINE2_LEN_M, m.pos, d2)
+        if j <= n:
+            heapq.heappush(heap, (j, ST_L2, 0, next(seq), m))
+    for line_no, name in enumerate(("U1", "U2")):
+        for m in lines[name]:
+            start[id(m)] = (0, m.pos)
+            j = ticks_to_done(UNL_LEN_M, m.pos, du[name])
+            if j <= n:
+                heapq.heappush(heap, (j, ST_UNL, line_no, next(seq), m))
+
+    # ayni tick ve asamada sira: serpantin sirasi / liste sirasi (seq artan)
+    while heap:
+        j, stage, line_no, _, m = heapq.heappop(heap)
+        sys._at_tick(k0 + j)
+        if stage == ST_BELT:
+            lines["L2"].append(sys._transfer(m, SEG_L2, 0.0, sys._speed_for("L2"), EV_BELT_L2))
+            start[id(m)] = (j - 1, 0.0)
+            jd = j - 1 + ticks_to_done(LINE2_LEN_M, 0.0, d2)
+            if jd <= n:
+                heapq.heappush(heap, (jd, ST_L2, 0, next(seq), m))
+        elif stage == ST_L2:
+            name = "U1" if (sys.rr % 2) == 0 else "U2"
+            sys.rr += 1
+            lines[name].append(sys._transfer(m, seg_of[name], 0.0, sys._speed_for(name), EV_L2_UNL))
+            start[id(m)] = (j - 1, 0.0)
+            jd = j - 1 + ticks_to_done(UNL_LEN_M, 0.0, du[name])
+            if jd <= n:
+                heapq.heappush(heap, (jd, ST_UNL, 0 if name == "U1" else 1, next(seq), m))
+        else:
+            name = "U1" if line_no == 0 else "U2"
+            done.add(id(m))
+            sys._release(m.id)
+            sys._record_unloads([m.id], name)
+
+    for b, seg in sys.belts.items():
+        while seg and seg[0].seg != b:
+            seg.popleft()
+        for m in seg:
+            m.pos = max(0.0, m.pos + n * db)
+
+    def settle(line: FifoLine, name: str):
+        sp = sys._speed_for(name)
+        kept = []
+        for m in lines[name]:
+            if m.seg != seg_of[name] or id(m) in done:
+                continue
+            j0, p0 = start[id(m)]
+            m.speed = sp
+            m.pos = p0 + (n - j0) * sp * DT
+            kept.append(m)
+        line.clear()
+        line.speed = sp
+        line.extend(kept)
+
+    settle(sys.line2, "L2")
+    settle(sys.unl1, "U1")
+    settle(sys.unl2, "U2")
+
+
+def _compact_from(seg: BeltQueue, i0: int, fresh: Optional[set], gap: float):
+    # HANG: hiz 0, bant adimi sadece sikistirir (idempotent); i0'dan itibaren
+    # yeniden hesapla, yeni eklenenler gecildikten sonra degismeyen ilk item'da dur
+    left = len(fresh) if fresh is not None else -1
+    prev = seg[i0 - 1].pos if i0 > 0 else None
+    for m in islice(seg, i0, None):
+        if prev is None:
+            q = min(m.pos, BELT_LEN_M)
+        else:
+            q = max(0.0, min(m.pos, prev - gap, BELT_LEN_M))
+        if fresh is not None:
+            if id(m) in fresh:
+                left -= 1
+            elif left == 0 and q == m.pos:
+                break
+        m.pos = prev = q
+
+
+def advance_hang(sys: ConveyorSystem, n: int, k0: int):
+    loop = sys.load_loop
+    sp = sys._speed_for("LOAD") or 0.0
+    gap = sys._belt_gap
+    events = loop_crossings(loop, sp * DT, n)
+    events.sort()
+
+    # raw: ilk tick'ten beri hic sikistirilmamis bantlar
+    # pending: b -> (tick, o tick'te banda eklenen item'lar)
+    raw = set(sys.belts)
+    pending: Dict[int, Tuple[int, List[Moving]]] = {}
+
+    def flush(b: int):
+        seg = sys.belts[b]
+        items = pending.pop(b, (0, []))[1]
+        first = len(seg)
+        for m in items:
+            first = min(first, seg.push(m))
+        if b in raw:
+            raw.discard(b)
+            _compact_from(seg, 0, None, gap)
+        elif items:
+            _compact_from(seg, first, {id(m) for m in items}, gap)
+
+    for j, _, _, _, m in events:
+        sys._at_tick(k0 + j)
+        b = sys.rng.belt.one()
+        pos = sys.rng.pos.one() * BELT_LEN_M
+        if (b in pending and pending[b][0] != j) or (b in raw and j > 1):
+            flush(b)
+        pending.setdefault(b, (j, []))[1].append(sys._transfer(m, b, pos, 0.0, EV_HANG))
+        sys.hanged_ids.add(m.id)
+    for b in list(pending) + list(raw):
+        flush(b)
+
+    loop_finish(loop, sp, n)
+    sys._at_tick(k0 + n)
@@ -0,0 +1,53 @@
+from statistics import fmean
+from typing import Dict, List, Optional
+
+from system import ConveyorSystem
+
+# Kosu KPI'lari: bosaltma suresi, en yuksek WIP, item basina cevrim suresi.
+# Hem headless kosucu (main.py) hem Monte Carlo kosucusu kullanir.
+
+
+def _pct(xs: List[float], q: float) -> float:
+    return xs[min(len(xs) - 1, int(q * len(xs)))]
+
+
+class KpiRecorder:
+    def __init__(self, sys: ConveyorSystem):
+        self.sys = sys
+        self.arrived_at: Dict[int, float] = {}
+        self.cycle: List[float] = []
+        self.last_out = 0.0
+        self.max_wip = 0
+        self.drains: List[Optional[float]] = []
+        sys.on_unloaded = self.on_unloaded
+
+    def add_item(self, barcode: str, station: int = 1):
+        self.arrived_at[self.sys.next_id] = self.sys.t
+        self.sys.add_item_from_barcode(barcode, station)
+        self.max_wip = max(self.max_wip, len(self.arrived_at))
+
+    def on_unloaded(self, iid: int, at: str, t: float):
+        self.cycle.append(t - self.arrived_at.pop(iid))
+        self.last_out = t
+
+    def leaving_mode(self):
+        # DRAIN'den cikarken (ya da kosu sonunda) bosaltma tamamlandi mi?
+        if self.sys.mode != "DRAIN":
+            return
+        snap = self.sys.snapshot()
+        empty = not (snap["in_belts"] or snap["in_l2"] or snap["in_u1"] or snap["in_u2"])
+        self.drains.append(max(0.0, self.last_out - self.sys.drain_started_at) if empty else None)
+
+    def report(self) -> Dict[str, object]:
+        cycle = sorted(self.cycle)
+        return {
+            "arrived": len(cycle) + len(self.arrived_at),
+            "done": len(cycle),
+            "wip_end": len(self.arrived_at),
+            "max_wip": self.max_wip,
+            "drain_s": list(self.drains),
+            "cycle_mean_s": fmean(cycle) if cycle else None,
+            "cycle_p50_s": _pct(cycle, 0.50) if cycle else None,
+            "cycle_p95_s": _pct(cycle, 0.95) if cycle else None,
+            "cycle_max_s": cycle[-1] if cycle else None,
+        }
@@ -0,0 +1,122 @@
+import atexit
+import json
+import sys
+import threading
+import time
+from functools import partial
+from queue import Empty, SimpleQueue
+from typing import Optional, TextIO
+
+# Tick dongusu asla terminal/dosya G/C'sinde beklemez: kayitlar kuyruga
+# atilir, bicimleme ve yazma arka plan thread'inde toplu yapilir.
+# Kapali seviyeler no-op'a baglanir; pahali alanlar icin once is_<seviye>
+# bayragina bakilir:  if log.is_debug: log.debug("x", a=pahali())
+
+DEBUG, INFO, WARNING, ERROR, OFF = 10, 20, 30, 40, 100
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR}
+LEVEL_NAMES = {lv: name for name, lv in LEVELS.items()}
+BATCH = 1024
+
+_STOP = object()
+
+
+def _noop(*args, **kwargs):
+    return None
+
+
+class LogSink:
+    def __init__(self, stream: Optional[TextIO] = None, level: int = INFO,
+                 fmt: str = "text", max_pending: int = 100_000):
+        assert fmt in ("text", "json")
+        self.stream = stream            # None: yazma aninda sys.stdout
+        self.fmt = fmt
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._q: SimpleQueue = SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self.set_level(level)
+
+    def set_level(self, level: int):
+        self.level = level
+        for name, lv in LEVELS.items():
+            on = lv >= level
+            setattr(self, "is_" + name, on)
+            setattr(self, name, partial(self._emit, lv) if on else _noop)
+
+    def _emit(self, level: int, event: str, msg: Optional[str] = None, **fields):
+        # msg bir format sablonudur; bicimleme yazici thread'inde yapilir
+        if self._q.qsize() >= self.max_pending:
+            self.dropped += 1
+            return
+        self._q.put((time.time(), level, event, msg, fields))
+        if self._thread is None:
+            self._start()
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+                self._thread.start()
+
+    def _format(self, rec) -> str:
+        ts, level, event, msg, fields = rec
+        if self.fmt == "json":
+            out = {"ts": round(ts, 6), "level": LEVEL_NAMES.get(level, level), "event": event}
+            out.update(fields)
+            return json.dumps(out, default=str)
+        if msg is not None:
+            return msg.format(**fields)
+        return " ".join([event] + [f"{k}={v}" for k, v in fields.items()])
+
+    def _run(self):
+        q = self._q
+        while True:
+            batch = [q.get()]
+            try:
+                while len(batch) < BATCH:
+                    batch.append(q.get_nowait())
+            except Empty:
+                pass
+            lines, waiters, stop = [], [], False
+            for rec in batch:
+                if rec is _STOP:
+                    stop = True
+                elif isinstance(rec, threading.Event):
+                    waiters.append(rec)
+                else:
+                    try:
+                        lines.append(self._format(rec))
+                    except Exception as e:
+                        lines.append(f"[log] bicimleme hatasi: {rec[2]}: {e!r}")
+            if lines:
+                out = self.stream or sys.stdout
+                try:
+                    out.write("\n".join(lines) + "\n")
+                    out.flush()
+                except Exception:
+                    pass
+            for w in waiters:
+                w.set()
+            if stop:
+                return
+
+    def flush(self, timeout: Optional[float] = None):
+        # bekleyen kayitlar yazilana kadar bekle (cagiran thread bloklanir)
+        if self._thread is None:
+            return
+        done = threading.Event()
+        self._q.put(done)
+        done.wait(timeout)
+
+    def close(self):
+        if self._thread is None:
+            return
+        self._q.put(_STOP)
+        self._thread.join()
+        self._thread = None
+
+
+LOG = LogSink()
+QUIET = LogSink(level=OFF)
+atexit.register(LOG.flush, 2.0)
@@ -1,45 +1,125 @@
+import asyncio
 import time
-from system import ConveyorSystem
+from typing import Dict, List, Optional, Tuple
+from system import ConveyorSystem, ENGINES
 from config import DT
+from kpi import KpiRecorder
+from logsink import LOG, WARNING
+from runner import serve
+from commands import KEYS, apply_key
 
-def run():
+def run(speed: float = 1.0, profile_s: Optional[float] = None):
+    # tick'ler mutlak son tarihlere gore; konsol ve telemetri ayni asyncio dongusunde
     sys = ConveyorSystem()
+    if profile_s:
+        sys.enable_profiling(profile_s)
     sys.on_unloaded = lambda iid, at, ts: None
-    print("Başladı. R: DRAIN/COLLECT, P: PENÇE/ASKI, H: HANG, B: BARKOD, Q: çıkış")
+    LOG.info("start", "Başladı. R: DRAIN/COLLECT, P: PENÇE/ASKI, H: HANG, B: BARKOD, Q: çıkış")
     try:
-        try:
-            import msvcrt
-            has_msvcrt = True
-        except ImportError:
-            has_msvcrt = False
-            print("(Uyarı) msvcrt yok: tuş algılama kapalı; simülasyon akacak.")
-        while True:
-            start = time.time()
-            ch = None
-            if has_msvcrt and msvcrt.kbhit():
-                ch = msvcrt.getwch().lower()
-            if ch == "q":
-                break
-            elif ch == "r":
-                sys.toggle_mode()
-                print(f"-> Mode: {sys.mode}")
-            elif ch == "p":
-                sys.pick_and_hang()
-                print("-> P: LOAD -> (L1/BELT/LOAD rastgele) taşı ve dondur")
-            elif ch == "h":
-                sys._enter_hang()
-                print("-> Mode: HANG (askıda bekleme)")
-            elif ch == "b":
-                code = f"BC{sys.next_id:04d}"
-                sys.add_item_from_barcode(code, station=1)
-            sys.tick()
-            if int(sys.t) != int(sys.t - DT):
-                print(sys.snapshot(), flush=True)
-            elapsed = time.time() - start
-            time.sleep(max(0.0, DT - elapsed))
+        import msvcrt  # noqa: F401
+    except ImportError:
+        LOG.warning("no_msvcrt", "(Uyarı) msvcrt yok: komutlar satır satır okunur (tuş + Enter).")
+    runner = None
+    try:
+        runner = asyncio.run(serve(sys, speed))
     except KeyboardInterrupt:
         pass
-    print("Durdu.")
+    LOG.info("stop", "Durdu.", **(runner.stats() if runner else {}))
+    LOG.flush()
+
+# Komut betigi: her satir "<t_sn> <tus> [adet] [istasyon]"; '#' sonrasi yorum.
+# Ornek:  0 b 200 1  /  600 r  /  900 h
+def parse_script(lines) -> List[Tuple[float, str, int, int]]:
+    out = []
+    for line in lines:
+        line = line.split("#", 1)[0].strip()
+        if not line:
+            continue
+        parts = line.replace(":", " ").split()
+        t, ch = float(parts[0]), parts[1].lower()
+        if ch not in KEYS:
+            raise ValueError(f"bilinmeyen tuş: {ch!r} (satır: {line!r})")
+        count = int(parts[2]) if len(parts) > 2 else 1
+        station = int(parts[3]) if len(parts) > 3 else 1
+        out.append((t, ch, count, station))
+    out.sort(key=lambda c: c[0])
+    return out
+
+def run_headless(script: List[Tuple[float, str, int, int]], duration_s: float,
+                 speed: Optional[float] = None, every_s: Optional[float] = None,
+                 engine: str = "list", seed: Optional[int] = None,
+                 profile_s: Optional[float] = None) -> Dict[str, object]:
+    # speed=None: olabildigince hizli (advance ile atlar); speed=k: gercek zamanin k kati
+    # profil yalnizca kosulan tick'leri olcer; advance'in atladigi araliklar gorunmez
+    sys = ConveyorSystem(engine, seed=seed)
+    if profile_s:
+        sys.enable_profiling(profile_s)
+    kpi = KpiRecorder(sys)
+    n_end = int(round(duration_s / DT))
+    stops = sorted({int(round(t / DT)) for t, *_ in script if t <= duration_s} | {n_end})
+    if every_s:
+        stops = sorted(set(stops) | set(range(0, n_end, max(1, int(round(every_s / DT))))))
+    todo = [(int(round(t / DT)), ch, count, station) for t, ch, count, station in script]
+    wall0 = time.perf_counter()
+    cur = 0
+    for k in stops:
+        if speed is None:
+            sys.advance((k - cur) * DT)
+        else:
+            for j in range(cur + 1, k + 1):
+                sys.tick()
+                # mutlak hedefe gore uyu: gecikme birikmez
+                lag = wall0 + j * DT / speed - time.perf_counter()
+                if lag > 0:
+                    time.sleep(lag)
+        cur = k
+        if every_s and LOG.is_info and k % max(1, int(round(every_s / DT))) == 0:
+            LOG.info("snapshot", "{snapshot}", snapshot=sys.snapshot())
+        while todo and todo[0][0] <= k:
+            _, ch, count, station = todo.pop(0)
+            for _ in range(count):
+                apply_key(sys, ch, kpi, station)
+    kpi.leaving_mode()
+    wall = time.perf_counter() - wall0
+    report = {"snapshot": sys.snapshot()}
+    report.update(kpi.report())
+    report["wall_s"] = wall
+    report["speedup"] = (n_end * DT) / wall if wall > 0 else None
+    if sys.profiler is not None:
+        report["profile"] = {name: {k: v for k, v in st.items() if k != "hist"}
+                             for name, st in sys.profiler.stats().items()}
+    return report
 
 if __name__ == "__main__":
-    run()
+    import argparse
+    import json
+    ap = argparse.ArgumentParser(description="Konveyör simülasyonu")
+    ap.add_argument("--headless", action="store_true", help="klavyesiz, betikli koşu")
+    ap.add_argument("--script", help="komut betiği dosyası ('-' = stdin)")
+    ap.add_argument("--cmd", action="append", default=[], help="tek komut, ör. '600:r' veya '0:b:100'")
+    ap.add_argument("--duration", type=float, default=3600.0, help="simülasyon süresi (sn)")
+    ap.add_argument("--speed", type=float, default=0.0, help="gerçek zaman katı; 0 = olabildiğince hızlı")
+    ap.add_argument("--every", type=float, default=None, help="her N simülasyon saniyesinde snapshot yaz")
+    ap.add_argument("--engine", choices=ENGINES, default="list")
+    ap.add_argument("--seed", type=int, default=None)
+    ap.add_argument("--profile", type=float, default=None, metavar="SN",
+                    help="tick asamalarini ölç; her SN simülasyon saniyesinde özet satırı yaz")
+    ap.add_argument("--quiet", action="store_true", help="yalnızca uyarı ve üstünü yaz")
+    ap.add_argument("--log-json", action="store_true", help="günlük kayıtlarını JSON satırları olarak yaz")
+    args = ap.parse_args()
+    if args.quiet:
+        LOG.set_level(WARNING)
+    if args.log_json:
+        LOG.fmt = "json"
+    if not args.headless:
+        run(args.speed or 1.0, args.profile)
+    else:
+        import contextlib, sys as _sys
+        lines = list(args.cmd)
+        if args.script:
+            with (contextlib.nullcontext(_sys.stdin) if args.script == "-" else open(args.script)) as f:
+                lines += f.read().splitlines()
+        report = run_headless(parse_script(lines), args.duration, args.speed or None,
+                              args.every, args.engine, args.seed, args.profile)
+        LOG.flush()
+        print(json.dumps(report, indent=2))
@@ -0,0 +1,200 @@
+import contextlib
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from math import ceil
+from statistics import fmean
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import config
+from config import SPAWN_RATES
+from kpi import KpiRecorder
+from logsink import QUIET
+from system import ConveyorSystem
+
+# Bagimsiz senaryolar: her kosu kendi surecinde, kendi seed'i ve config
+# degisiklikleriyle calisir; ebeveyne yalnizca ozet KPI'lar doner.
+
+ACTIONS = ("toggle", "pick", "hang")
+HERE = os.path.dirname(os.path.abspath(__file__))
+# ilk yukleme dongusunun config adlari topolojiden turetilir; motorlar
+# TOPOLOGY'yi okur, bu adlar turetilmis bir TOPOLOGY ile birlikte yamanir
+LOOP_NAMES = {"LOAD_LOOP_LEN_M": "length", "SW_POS_M": "switch_pos", "STATION_POS_M": "stations"}
+# indeks tablolari import aninda derlenir; yalnizca topoloji dosyasindan degisir
+LAYOUT_NAMES = ("BELTS_R", "BELTS_C", "TOPOLOGY", "SEG_LOAD", "SEG_L1", "SEG_L2", "SEG_U1", "SEG_U2", "SEG_LOADS")
+
+
+@dataclass
+class Scenario:
+    seed: int
+    duration_s: float = 3600.0
+    rates: Tuple[float, ...] = SPAWN_RATES       # istasyon basina varis/sn (Poisson)
+    arrivals_until_s: Optional[float] = None      # None: tum sure boyunca
+    schedule: List[Tuple[float, str]] = field(default_factory=list)  # (t, ACTIONS)
+    overrides: Dict[str, object] = field(default_factory=dict)      # config adi -> deger
+    engine: str = "list"
+
+
+def _sim_modules() -> list:
+    # yalnizca conveyor_sim modulleri (kokteki motorlar ayni adlari ayrica tanimlar)
+    return [m for m in list(sys.modules.values())
+            if getattr(m, "__file__", None) and os.path.dirname(os.path.abspath(m.__file__)) == HERE]
+
+
+@contextlib.contextmanager
+def _overrides(values: Dict[str, object]):
+    # config adlari modullere 'from config import' ile kopyalandigi icin
+    # config'teki degeri tasiyan tum moduller yamanir. Gec import edilen
+    # moduller (advance -> events, "numpy" -> soa) once yuklenir; yoksa
+    # blok icinde ilk kez import edilip yamali degeri kalici baglarlar.
+    import events, segments, system  # noqa: F401
+    with contextlib.suppress(ImportError):
+        import soa  # noqa: F401
+    for name in values:
+        if not hasattr(config, name):
+            raise KeyError(f"bilinmeyen config adi: {name}")
+        if name in LAYOUT_NAMES:
+            raise ValueError(f"{name} topoloji dosyasindan gelir (CONVEYOR_TOPOLOGY)")
+    loop = {LOOP_NAMES[n]: v for n, v in values.items() if n in LOOP_NAMES}
+    if loop:
+        values = dict(values, TOPOLOGY=config.TOPOLOGY.with_loop(0, **loop))
+    saved = []
+    for name, value in values.items():
+        old = getattr(config, name)
+        for mod in _sim_modules():
+            if getattr(mod, name, None) is old:
+                saved.append((mod, name, old))
+                setattr(mod, name, value)
+    try:
+        yield
+    finally:
+        for mod, name, value in reversed(saved):
+            setattr(mod, name, value)
+        # blok icinde yine de import edilen modul yamali degeri baglamis olabilir
+        for name, value in values.items():
+            old = getattr(config, name)
+            for mod in _sim_modules():
+                if getattr(mod, name, None) is value and value is not old:
+                    setattr(mod, name, old)
+
+
+def _arrivals(sc: Scenario, dt: float) -> List[Tuple[int, int]]:
+    # (tick, istasyon); tick k'da eklenen item k. tick()'ten once sisteme girer
+    rng = random.Random(f"{sc.seed}:arrivals")
+    until = sc.duration_s if sc.arrivals_until_s is None else sc.arrivals_until_s
+    out = []
+    for station, rate in enumerate(sc.rates, start=1):
+        if rate <= 0:
+            continue
+        t = rng.expovariate(rate)
+        while t < until:
+            out.append((int(ceil(t / dt)), station))
+            t += rng.expovariate(rate)
+    out.sort()
+    return out
+
+
+def run_scenario(sc: Scenario) -> Dict[str, object]:
+    wall = time.perf_counter()
+    with _overrides(sc.overrides):
+        # zaman cizelgesi blok icinde: DT de yamanabilir, tick'ler yamali DT ile
+        dt = config.DT
+        n_end = int(round(sc.duration_s / dt))
+        timeline = [(k, 0, a) for k, a in ((int(round(t / dt)), a) for t, a in sc.schedule) if k <= n_end]
+        timeline += [(k, 1, st) for k, st in _arrivals(sc, dt) if k <= n_end]
+        timeline.sort()
+        s = ConveyorSystem(sc.engine, seed=sc.seed)
+        s.log = QUIET
+        kpi = KpiRecorder(s)
+        for k, kind, what in timeline:
+            s.advance((k - s.k) * dt)
+            if kind == 0:
+                if what not in ACTIONS:
+                    raise ValueError(f"bilinmeyen eylem: {what}")
+                if what == "toggle":
+                    kpi.leaving_mode()
+                    s.toggle_mode()
+                elif what == "pick":
+                    s.pick_and_hang()
+                else:
+                    kpi.leaving_mode()
+                    s._enter_hang()
+            else:
+                kpi.add_item(f"MC{s.next_id:06d}", station=what)
+        s.advance((n_end - s.k) * dt)
+        kpi.leaving_mode()
+
+    out = {"seed": sc.seed, "engine": sc.engine, "t_end": s.t}
+    out.update(kpi.report())
+    out["wall_s"] = time.perf_counter() - wall
+    return out
+
+
+def run_batch(scenarios: Iterable[Scenario], workers: Optional[int] = None) -> Iterator[Dict[str, object]]:
+    # sonuclar bittikce akar (gonderim sirasi degil); kosular birbirinden bagimsiz
+    scenarios = list(scenarios)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for sc in scenarios:
+            yield run_scenario(sc)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futs = [pool.submit(run_scenario, sc) for sc in scenarios]
+        for f in as_completed(futs):
+            yield f.result()
+
+
+def summarize(results: Iterable[Dict[str, object]]) -> Dict[str, object]:
+    results = list(results)
+
+    def col(key: str) -> List[float]:
+        return [r[key] for r in results if r[key] is not None]
+
+    drains = [d for r in results for d in r["drain_s"]]
+    done_drains = [d for d in drains if d is not None]
+    out: Dict[str, object] = {"runs": len(results)}
+    for key in ("done", "max_wip", "cycle_mean_s", "cycle_p95_s", "cycle_max_s"):
+        xs = col(key)
+        out[key] = {"mean": fmean(xs), "min": min(xs), "max": max(xs)} if xs else None
+    out["drain_s"] = {
+        "completed": len(done_drains),
+        "incomplete": len(drains) - len(done_drains),
+        "mean": fmean(done_drains) if done_drains else None,
+        "max": max(done_drains) if done_drains else None,
+    }
+    return out
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    ap = argparse.ArgumentParser(description="Monte Carlo senaryo kosucusu")
+    ap.add_argument("--runs", type=int, default=8)
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--duration", type=float, default=1800.0)
+    ap.add_argument("--rate", type=float, default=0.25, help="istasyon basina varis/sn")
+    ap.add_argument("--drain-at", type=float, default=1200.0)
+    ap.add_argument("--engine", choices=("list", "numpy"), default="list")
+    args = ap.parse_args()
+
+    scs = [
+        Scenario(
+            seed=args.seed + i,
+            duration_s=args.duration,
+            rates=(args.rate,) * len(SPAWN_RATES),
+            arrivals_until_s=args.drain_at,
+            schedule=[(args.drain_at, "toggle")],
+            engine=args.engine,
+        )
+        for i in range(args.runs)
+    ]
+    results = []
+    for r in run_batch(scs, args.workers):
+        results.append(r)
+        print(json.dumps(r), flush=True)
+    print(json.dumps(summarize(results), indent=2))
@@ -1,24 +1,91 @@
+from array import array
 from dataclasses import dataclass
+from itertools import repeat
+from typing import Iterable, List, Tuple
 
-@dataclass
+from config import SEG_LOAD, SEG_L1, SEG_L2, SEG_U1, SEG_U2, SEG_LOADS
+
+SEG_NAMES = {SEG_LOAD: "LOAD", SEG_L1: "L1", SEG_L2: "L2", SEG_U1: "U1", SEG_U2: "U2"}
+SEG_NAMES.update((s, f"LOAD{i + 1}") for i, s in enumerate(SEG_LOADS) if i)
+
+
+def seg_name(seg: int) -> str:
+    return SEG_NAMES.get(seg) or f"B{seg}"
+
+
+@dataclass(slots=True)
 class Moving:
+    # sicak kayit: tick dongusu yalnizca pos/speed'e dokunur; uzunluk segmentte,
+    # soguk alanlar sistemin ItemTable'inda (id ile)
     id: int
-    seg: str          
+    seg: int
     pos: float
-    length: float
-    speed: float
-    wrap: bool = False
-    created_at: float = 0.0       
-    entered_area_at: float = 0.0  
-    barcode: str = ""
-
-    def step(self, dt: float):
-        sp = 0.0 if self.speed is None else self.speed
-        if self.wrap:
-            self.pos = (self.pos + sp * dt) % self.length
-        else:
-            self.pos += sp * dt
-
-    @property
-    def done(self) -> bool:
-        return (not self.wrap) and (self.pos >= self.length - 1e-9)
+    speed: float = 0.0
+
+    def move_to(self, seg: int, pos: float, speed: float) -> "Moving":
+        # segment gecisi: yeni nesne kurmak yerine ayni kaydi yeniden etiketle
+        self.seg = seg
+        self.pos = pos
+        self.speed = speed
+        return self
+
+
+def pack_items(items: Iterable[Moving]) -> Tuple[bytes, bytes, bytes, bytes]:
+    # checkpoint icin sutun halinde: id, seg, pos, speed
+    ids, segs, pos, speed = array("q"), array("q"), array("d"), array("d")
+    for m in items:
+        ids.append(m.id)
+        segs.append(m.seg)
+        pos.append(m.pos)
+        speed.append(m.speed)
+    return ids.tobytes(), segs.tobytes(), pos.tobytes(), speed.tobytes()
+
+
+def unpack_items(cols: Tuple[bytes, bytes, bytes, bytes]) -> List[Moving]:
+    ids, segs, pos, speed = (array(code, b) for code, b in zip("qqdd", cols))
+    return list(map(Moving, ids, segs, pos, speed))
+
+
+class ItemTable:
+    # soguk alanlar id ile indekslenen sutunlarda (id'ler 1'den ardisik verilir)
+    def __init__(self):
+        self.created_at = array("d")
+        self.entered_area_at = array("d")
+        self.barcode: List[str] = []
+
+    def __len__(self) -> int:
+        return len(self.barcode)
+
+    def add(self, iid: int, t: float, barcode: str = ""):
+        k = iid + 1 - len(self.barcode)
+        if k > 0:
+            self.created_at.extend(repeat(0.0, k))
+            self.entered_area_at.extend(repeat(0.0, k))
+            self.barcode.extend(repeat("", k))
+        self.created_at[iid] = t
+        self.entered_area_at[iid] = t
+        self.barcode[iid] = barcode
+
+    def add_many(self, i0: int, t: float, barcodes: List[str]):
+        end = i0 + len(barcodes)
+        k = end - len(self.barcode)
+        if k > 0:
+            self.created_at.extend(repeat(0.0, k))
+            self.entered_area_at.extend(repeat(0.0, k))
+            self.barcode.extend(repeat("", k))
+        stamps = array("d", repeat(t, len(barcodes)))
+        self.created_at[i0:end] = stamps
+        self.entered_area_at[i0:end] = stamps
+        self.barcode[i0:end] = barcodes
+
+    def release(self, iid: int):
+        # zaman damgalari sabit boyutlu; yalnizca barkod string'ini birak
+        self.barcode[iid] = ""
+
+    def get_state(self) -> Tuple[bytes, bytes, List[str]]:
+        return self.created_at.tobytes(), self.entered_area_at.tobytes(), list(self.barcode)
+
+    def set_state(self, st: Tuple[bytes, bytes, List[str]]):
+        self.created_at = array("d", st[0])
+        self.entered_area_at = array("d", st[1])
+        self.barcode = list(st[2])
@@ -0,0 +1,151 @@
+from array import array
+from time import perf_counter_ns
+from typing import Callable, Dict, Optional
+
+from config import DT
+
+# Asama profili: acikken tick() ve bes asamasi ornek ozniteligi olarak
+# olcum sarmalayicilariyla degistirilir; kapaliyken sinif metotlari
+# dokunulmadan kalir, tick yolunda ek kontrol yoktur. Sureler sabit boyutlu
+# log2 histogramlara (kova b: 2^(b-1) <= ns < 2^b), asamaya giren item
+# sayilari toplam ve tepe olarak yazilir.
+
+STAGES = (
+    ("spawn", "_spawn"),
+    ("load_loop", "_step_load_loop"),
+    ("belts", "_step_belts"),
+    ("line2", "_step_line2"),
+    ("unloads", "_step_unloads"),
+)
+NBINS = 32                      # son kova ~1 sn ve ustu
+
+
+# asama -> asama baslarken islenecek item sayisi (spawn: eklenen)
+COUNTERS: Dict[str, Callable[[object], int]] = {
+    "tick": lambda s: s.next_id - 1 - len(s.done_log),
+    "load_loop": lambda s: s._load_items(),
+    "belts": lambda s: s._belt_items(),
+    "line2": lambda s: len(s.line2),
+    "unloads": lambda s: len(s.unl1) + len(s.unl2),
+}
+
+
+class StageStats:
+    __slots__ = ("calls", "total_ns", "max_ns", "items", "max_items", "hist")
+
+    def __init__(self):
+        self.calls = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.items = 0
+        self.max_items = 0
+        self.hist = array("q", bytes(8 * NBINS))
+
+    def add(self, ns: int, n: int):
+        self.calls += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+        self.items += n
+        if n > self.max_items:
+            self.max_items = n
+        self.hist[min(ns.bit_length(), NBINS - 1)] += 1
+
+    def quantile_ns(self, q: float) -> int:
+        # kova ust siniri; gercek deger en fazla 2 kat kucuk
+        if not self.calls:
+            return 0
+        need = q * self.calls
+        seen = 0
+        for b, c in enumerate(self.hist):
+            seen += c
+            if c and seen >= need:
+                return 1 << b
+        return 1 << (NBINS - 1)
+
+    def as_dict(self) -> Dict[str, object]:
+        n = self.calls or 1
+        return {
+            "calls": self.calls, "mean_us": self.total_ns / n / 1e3, "max_us": self.max_ns / 1e3,
+            "p50_us": self.quantile_ns(0.5) / 1e3, "p99_us": self.quantile_ns(0.99) / 1e3,
+            "items": self.items, "mean_items": self.items / n, "max_items": self.max_items,
+            "hist": list(self.hist),
+        }
+
+
+class TickProfiler:
+    def __init__(self, sys, every_s: Optional[float] = None):
+        self.sys = sys
+        self.set_every(every_s)
+        self.stages: Dict[str, StageStats] = {"tick": StageStats()}
+        self.stages.update((name, StageStats()) for name, _ in STAGES)
+        self._last = {name: (0, 0, 0) for name in self.stages}
+        self.attached = False
+
+    def set_every(self, every_s: Optional[float]):
+        # ozet satiri her every_s simulasyon saniyesinde; None/0 = kapali
+        self.every = max(1, int(round(every_s / DT))) if every_s else 0
+
+    def attach(self):
+        if self.attached:
+            return
+        sys = self.sys
+        for name, attr in STAGES:
+            setattr(sys, attr, self._wrap(name, getattr(sys, attr)))
+        sys.tick = self._wrap("tick", sys.tick, self._tick_done)
+        self.attached = True
+
+    def detach(self):
+        # ornek ozniteliklerini sil: sinif metotlari geri gelir
+        if not self.attached:
+            return
+        for attr in ("tick",) + tuple(attr for _, attr in STAGES):
+            self.sys.__dict__.pop(attr, None)
+        self.attached = False
+
+    def _wrap(self, name: str, fn, after: Optional[Callable[[], None]] = None):
+        st = self.stages[name]
+        sys = self.sys
+        count = COUNTERS.get(name)
+        if count is None:
+            # spawn: asamanin ekledigi item sayisi
+            def timed():
+                i0 = sys.next_id
+                t0 = perf_counter_ns()
+                fn()
+                st.add(perf_counter_ns() - t0, sys.next_id - i0)
+        else:
+            def timed():
+                n = count(sys)
+                t0 = perf_counter_ns()
+                fn()
+                st.add(perf_counter_ns() - t0, n)
+                if after is not None:
+                    after()
+        return timed
+
+    def _tick_done(self):
+        if self.every and self.sys.k % self.every == 0 and self.sys.log.is_info:
+            self.sys.log.info("profile", "[PROFIL] t={t:.1f} {summary}", t=self.sys.t, summary=self.summary())
+
+    def reset(self):
+        # sarmalayicilar ayni nesneleri tuttugu icin yerinde sifirla
+        for name, st in self.stages.items():
+            st.__init__()
+            self._last[name] = (0, 0, 0)
+
+    def stats(self) -> Dict[str, Dict[str, object]]:
+        return {name: st.as_dict() for name, st in self.stages.items()}
+
+    def summary(self) -> str:
+        # son ozetten beri: ortalama sure ve ortalama item, asama basina
+        parts = []
+        for name, st in self.stages.items():
+            calls, ns, items = st.calls, st.total_ns, st.items
+            c0, ns0, i0 = self._last[name]
+            self._last[name] = (calls, ns, items)
+            k = calls - c0
+            if not k:
+                continue
+            parts.append(f"{name} {(ns - ns0) / k / 1e3:.1f}us/{(items - i0) / k:.0f}")
+        return " ".join(parts) or "-"
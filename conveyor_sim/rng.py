@@ -0,0 +1,91 @@
+import random
+from array import array
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Her karar noktasi (bant, konum, askiya alma hedefi) kendi seed'li akisindan
+# ceker. Cekimler blok halinde onceden uretilir: tek tek ya da toplu cekmek
+# ayni diziyi verir, bu yuzden tick, olay motoru ve numpy motoru ayni sonucu uretir.
+
+BLOCK = 4096
+
+
+class Stream:
+    def __init__(self, fill: Callable[[int], List], code: str):
+        self._fill = fill
+        self.code = code
+        self._buf: List = []
+        self._i = 0
+
+    def one(self):
+        if self._i >= len(self._buf):
+            self._buf = self._fill(BLOCK)
+            self._i = 0
+        v = self._buf[self._i]
+        self._i += 1
+        return v
+
+    def take(self, k: int) -> List:
+        out: List = []
+        while k > 0:
+            if self._i >= len(self._buf):
+                self._buf = self._fill(max(BLOCK, k))
+                self._i = 0
+            j = min(len(self._buf), self._i + k)
+            out += self._buf[self._i:j]
+            k -= j - self._i
+            self._i = j
+        return out
+
+    def get_state(self) -> bytes:
+        # yalnizca henuz cekilmemis kisim
+        return array(self.code, self._buf[self._i:]).tobytes()
+
+    def set_state(self, st: bytes):
+        self._buf = array(self.code, st).tolist()
+        self._i = 0
+
+
+class RngStreams:
+    # belt: [1, n_belts] bant no, pos: [0, 1) birim konum, target: [0, n_targets) hedef
+    def __init__(self, seed: Optional[int], n_belts: int, n_targets: int):
+        self.seed = seed
+        try:
+            import numpy as np
+        except ImportError:
+            np = None
+        self.numpy = np is not None
+        if np is not None:
+            gb, gp, gt = self._gens = tuple(
+                np.random.default_rng(s) for s in np.random.SeedSequence(seed).spawn(3))
+            self.belt = Stream(lambda k: gb.integers(1, n_belts + 1, size=k).tolist(), "q")
+            self.pos = Stream(lambda k: gp.random(k).tolist(), "d")
+            self.target = Stream(lambda k: gt.integers(0, n_targets, size=k).tolist(), "q")
+        else:
+            rb, rp, rt = self._gens = tuple(random.Random(None if seed is None else f"{seed}:{name}")
+                                            for name in ("belt", "pos", "target"))
+            self.belt = Stream(lambda k: [rb.randint(1, n_belts) for _ in range(k)], "q")
+            self.pos = Stream(lambda k: [rp.random() for _ in range(k)], "d")
+            self.target = Stream(lambda k: [rt.randrange(n_targets) for _ in range(k)], "q")
+
+    def _streams(self) -> Tuple[Stream, Stream, Stream]:
+        return self.belt, self.pos, self.target
+
+    def get_state(self) -> Dict[str, object]:
+        if self.numpy:
+            gens = [g.bit_generator.state for g in self._gens]
+        else:
+            gens = [g.getstate() for g in self._gens]
+        return {"seed": self.seed, "numpy": self.numpy, "gens": gens,
+                "bufs": [st.get_state() for st in self._streams()]}
+
+    def set_state(self, st: Dict[str, object]):
+        if st["numpy"] != self.numpy:
+            raise ValueError("RNG durumu farkli bir ortamda (numpy var/yok) kaydedilmis")
+        self.seed = st["seed"]
+        for g, gs in zip(self._gens, st["gens"]):
+            if self.numpy:
+                g.bit_generator.state = gs
+            else:
+                g.setstate(gs)
+        for stream, buf in zip(self._streams(), st["bufs"]):
+            stream.set_state(buf)
@@ -0,0 +1,129 @@
+import asyncio
+import threading
+from typing import AsyncIterator, Optional
+
+from config import DT
+from commands import CommandQueue, KEYS
+
+# Gercek zamanli kosucu: tick'ler mutlak monoton son tarihlere gore
+# planlanir (t0 + j * DT / speed), uyku hatasi birikmez. Bir tick gec
+# kalirsa sonraki tick'ler uyumadan arka arkaya kosar (yakalama); gecikme
+# max_lag_s'i asarsa kalan tick'ler atlanmaz, saat yeniden cakilir ve
+# tasma sayilir. Okuyucu, konsol ve telemetri ayni dongude coroutine'dir;
+# sisteme yalnizca CommandQueue uzerinden dokunurlar.
+
+
+class RealtimeRunner:
+    def __init__(self, sys, speed: float = 1.0, max_lag_s: float = 1.0):
+        self.sys = sys
+        if sys.commands is None:
+            sys.commands = CommandQueue()
+        self.speed = speed
+        self.max_lag_s = max_lag_s
+        self.ticks = 0
+        self.late = 0           # son tarihini kacirip yakalanan tick sayisi
+        self.overruns = 0       # max_lag_s asilip saatin yeniden cakildigi durum
+        self.worst_lag_s = 0.0
+        self.stopped = asyncio.Event()
+
+    def stop(self):
+        self.stopped.set()
+
+    async def run(self, duration_s: Optional[float] = None):
+        loop = asyncio.get_running_loop()
+        period = DT / self.speed
+        n_end = None if duration_s is None else int(round(duration_s / DT))
+        t0 = loop.time()
+        j = 0
+        while not self.stopped.is_set() and (n_end is None or self.ticks < n_end):
+            self.sys.tick()
+            self.ticks += 1
+            j += 1
+            lag = loop.time() - (t0 + j * period)
+            if lag <= 0:
+                await asyncio.sleep(-lag)
+                continue
+            self.late += 1
+            self.worst_lag_s = max(self.worst_lag_s, lag)
+            if lag > self.max_lag_s:
+                self.overruns += 1
+                self.sys.log.warning("overrun", "[UYARI] tick {lag:.3f} sn geride; saat yeniden kuruluyor",
+                                     lag=lag, t=self.sys.t)
+                t0, j = loop.time(), 0
+            # yakalarken de diger coroutine'lere sira ver
+            await asyncio.sleep(0)
+        self.stopped.set()
+
+    def stats(self):
+        return {"ticks": self.ticks, "late": self.late, "overruns": self.overruns,
+                "worst_lag_s": self.worst_lag_s}
+
+
+async def scanner(commands: CommandQueue, source: "asyncio.Queue[str]", station: int = 1):
+    # bir barkod gelince kuyrukta birikmis olanlarla birlikte tek partide gonder
+    while True:
+        codes = [await source.get()]
+        while not source.empty():
+            codes.append(source.get_nowait())
+        commands.submit("add_many", codes, station)
+
+
+async def telemetry(runner: RealtimeRunner, every_s: float = 1.0):
+    sys = runner.sys
+    while not runner.stopped.is_set():
+        await asyncio.sleep(every_s / runner.speed)
+        if sys.log.is_info:
+            sys.log.info("snapshot", "{snapshot}", snapshot=sys.snapshot(), **runner.stats())
+
+
+def _key_reader(loop: asyncio.AbstractEventLoop, out: "asyncio.Queue[str]"):
+    # bloklayan okuma ayri daemon thread'de; dongu hic beklemez
+    try:
+        import msvcrt
+        read = msvcrt.getwch
+    except ImportError:
+        import sys as _sys
+        read = lambda: (_sys.stdin.readline() or "q")[:1]
+    while True:
+        ch = read().lower()
+        if ch:
+            loop.call_soon_threadsafe(out.put_nowait, ch)
+        if ch == "q":
+            return
+
+
+async def keys() -> AsyncIterator[str]:
+    q: asyncio.Queue = asyncio.Queue()
+    threading.Thread(target=_key_reader, args=(asyncio.get_running_loop(), q),
+                     name="console", daemon=True).start()
+    while True:
+        yield await q.get()
+
+
+async def console(runner: RealtimeRunner, station: int = 1):
+    # tuslar betikli kosuyla ayni apply_key'e gider; tick basinda kuyruktan uygulanir
+    cmd = runner.sys.commands
+    async for ch in keys():
+        if ch == "q":
+            runner.stop()
+            return
+        if ch in KEYS:
+            cmd.submit("key", ch, station)
+
+
+async def serve(sys, speed: float = 1.0, duration_s: Optional[float] = None,
+                every_s: float = 1.0, interactive: bool = True,
+                barcodes: Optional["asyncio.Queue[str]"] = None, station: int = 1) -> RealtimeRunner:
+    runner = RealtimeRunner(sys, speed)
+    tasks = [asyncio.create_task(telemetry(runner, every_s))]
+    if interactive:
+        tasks.append(asyncio.create_task(console(runner, station)))
+    if barcodes is not None:
+        tasks.append(asyncio.create_task(scanner(sys.commands, barcodes, station)))
+    try:
+        await runner.run(duration_s)
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return runner
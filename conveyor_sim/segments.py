@@ -0,0 +1,329 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import deque
+from itertools import count
+from math import ceil
+from operator import itemgetter
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+from moving import Moving, pack_items, unpack_items
+
+
+class BeltQueue(deque):
+    # bas = lider (en ileri konum), sona dogru konum azalir.
+    # Bosluk kurali sirayi bozmadigi icin her tick siralamaya gerek yok.
+    def push(self, m: Moving) -> int:
+        k = len(self)
+        while k > 0 and self[k - 1].pos < m.pos:
+            k -= 1
+        if k == len(self):
+            self.append(m)
+        else:
+            self.insert(k, m)
+        return k
+
+    def min_pos(self) -> float:
+        return self[-1].pos
+
+    def get_state(self) -> Tuple[bytes, ...]:
+        return pack_items(self)
+
+    def set_state(self, st: Tuple[bytes, ...]):
+        self.clear()
+        self.extend(unpack_items(st))
+
+
+class FifoLine:
+    # Tek hizla akan hat (L2/U1/U2). Konumlar hat odometresine goredir:
+    # gercek konum = m.pos + (odo - base). Tick basina maliyet O(varis).
+    # Kuyruk cikis sirasinda tutulur (bas = en ileri); seq liste sirasidir.
+    # _base: id -> base, tek item'in konumu icin (pos_of) kuyruk taranmaz.
+    def __init__(self, length: float):
+        self.length = length
+        self.speed = 0.0
+        self.odo = 0.0
+        self._q: deque = deque()
+        self._base: Dict[int, float] = {}
+        self._seq = count()
+
+    def __len__(self) -> int:
+        return len(self._q)
+
+    def _pos(self, e) -> float:
+        return e[2].pos + (self.odo - e[1])
+
+    def __iter__(self) -> Iterator[Moving]:
+        self.sync()
+        return (e[2] for e in sorted(self._q, key=itemgetter(0)))
+
+    def append(self, m: Moving):
+        self.extend((m,))
+
+    def extend(self, items: Iterable[Moving]):
+        q = self._q
+        ordered = True
+        tail = self._pos(q[-1]) if q else None
+        for m in items:
+            if tail is not None and m.pos > tail:
+                ordered = False
+            tail = m.pos
+            q.append((next(self._seq), self.odo, m))
+            self._base[m.id] = self.odo
+        if not ordered:
+            self._q = deque(sorted(q, key=lambda e: -self._pos(e)))
+
+    def clear(self):
+        self._q.clear()
+        self._base.clear()
+
+    def min_pos(self) -> float:
+        return self._pos(self._q[-1])
+
+    def pos_of(self, m: Moving) -> float:
+        return m.pos + (self.odo - self._base[m.id])
+
+    def sync(self):
+        odo = self.odo
+        q = deque()
+        for seq, base, m in self._q:
+            m.pos += odo - base
+            m.speed = self.speed
+            q.append((seq, odo, m))
+        self._q = q
+        self._base = dict.fromkeys(self._base, odo)
+
+    def get_state(self) -> Dict[str, object]:
+        # ham kayit (seq, base, m.pos); konumlar senkronlanmadan, float'lar birebir
+        seq = next(self._seq)
+        self._seq = count(seq)
+        return {
+            "speed": self.speed, "odo": self.odo, "seq": seq,
+            "seqs": array("q", (e[0] for e in self._q)).tobytes(),
+            "bases": array("d", (e[1] for e in self._q)).tobytes(),
+            "items": pack_items(e[2] for e in self._q),
+        }
+
+    def set_state(self, st: Dict[str, object]):
+        self.speed = st["speed"]
+        self.odo = st["odo"]
+        self._seq = count(st["seq"])
+        self._q = deque(zip(array("q", st["seqs"]), array("d", st["bases"]), unpack_items(st["items"])))
+        self._base = {m.id: base for _, base, m in self._q}
+
+    def step(self, speed: float, dt: float) -> List[Moving]:
+        self.speed = speed
+        self.odo += speed * dt
+        q = self._q
+        limit = self.length - 1e-9
+        done = []
+        while q and self._pos(q[0]) >= limit:
+            done.append(q.popleft())
+        if not done:
+            return []
+        if len(done) > 1:
+            done.sort(key=itemgetter(0))
+        out = []
+        bases = self._base
+        for _, base, m in done:
+            del bases[m.id]
+            m.pos += self.odo - base
+            m.speed = speed
+            out.append(m)
+        if not q:
+            self._base = {}     # bosalan dict kapasitesini birakmaz
+        return out
+
+
+class Phase:
+    # Yukleme dongusu tek hizla doner: faz = (base + steps * d) % length.
+    # Faz kapali formda hesaplandigi icin olay motoru tick'le ayni float'lari uretir.
+    def __init__(self, length: float, switch_pos: float):
+        self.length = length
+        self.switch_pos = switch_pos
+        self.base = 0.0
+        self.steps = 0
+        self.d = 0.0
+
+    def at(self, k: int = 0) -> float:
+        return (self.base + (self.steps + k) * self.d) % self.length
+
+    def set_step(self, d: float):
+        if d != self.d:
+            self.base = self.at()
+            self.steps = 0
+            self.d = d
+
+    def step(self, d: float):
+        self.set_step(d)
+        self.steps += 1
+
+    def get_state(self) -> Tuple[float, int, float]:
+        return self.base, self.steps, self.d
+
+    def set_state(self, st: Tuple[float, int, float]):
+        self.base, self.steps, self.d = st
+
+    def rel(self, pos: float) -> float:
+        return (pos - self.at()) % self.length
+
+    def window(self, k: int) -> Tuple[float, float]:
+        # k. adimda swapper'i gecen goreli konum araligi [lo, hi] (dairesel)
+        return ((self.switch_pos - self.at(k)) % self.length,
+                (self.switch_pos - self.at(k - 1)) % self.length)
+
+    def in_window(self, r: float, k: int) -> bool:
+        lo, hi = self.window(k)
+        return lo <= r <= hi if lo <= hi else (r >= lo or r <= hi)
+
+    def crossing_step(self, r: float) -> int:
+        if self.d <= 0:
+            return 1 << 62
+        u = (self.switch_pos - r - self.at()) % self.length
+        est = max(1, ceil(u / self.d))
+        for k in sorted({1, est - 1, est, est + 1}):
+            if k >= 1 and self.in_window(r, k):
+                return k
+        k = est + 2
+        while not self.in_window(r, k):
+            k += 1
+        return k
+
+
+class LoadLoop:
+    # Halka: her item faza gore goreli konumla (r) sirali tutulur,
+    # gercek konum = (r + faz) % length. Swapper gecisi bir bisect penceresi.
+    # _rel: id -> r, tek item'in konumu icin (pos_of) halka taranmaz.
+    def __init__(self, length: float, switch_pos: float):
+        self.length = length
+        self.phase = Phase(length, switch_pos)
+        self.speed = 0.0
+        self._keys: List[float] = []
+        self._ents: List[Tuple[int, Moving]] = []
+        self._rel: Dict[int, float] = {}
+        self._seq = count()
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def entries(self) -> Iterator[Tuple[float, int, Moving]]:
+        return ((r, seq, m) for r, (seq, m) in zip(self._keys, self._ents))
+
+    def __iter__(self) -> Iterator[Moving]:
+        ph = self.phase.at()
+        out = []
+        for r, (seq, m) in zip(self._keys, self._ents):
+            m.pos = (r + ph) % self.length
+            m.speed = self.speed
+            out.append((seq, m))
+        out.sort(key=itemgetter(0))
+        return (m for _, m in out)
+
+    def _insert(self, r: float, m: Moving):
+        k = bisect_right(self._keys, r)
+        self._keys.insert(k, r)
+        self._ents.insert(k, (next(self._seq), m))
+        self._rel[m.id] = r
+
+    def append(self, m: Moving):
+        self._insert(self.phase.rel(m.pos), m)
+
+    def extend_at(self, pos: float, items: List[Moving]):
+        # hepsi ayni konumda (toplu barkod): tek bisect, tek dilim eklemesi;
+        # sirayla append ile ayni sonuc
+        r = self.phase.rel(pos)
+        k = bisect_right(self._keys, r)
+        self._keys[k:k] = [r] * len(items)
+        seq = self._seq
+        self._ents[k:k] = [(next(seq), m) for m in items]
+        self._rel.update((m.id, r) for m in items)
+
+    def clear(self):
+        self._keys.clear()
+        self._ents.clear()
+        self._rel.clear()
+
+    def take_all(self) -> List[Moving]:
+        out = list(self)
+        self.clear()
+        return out
+
+    def extract(self, pred: Callable[[Moving], bool]) -> List[Moving]:
+        out = [m for m in self if pred(m)]
+        if out:
+            keys, ents = [], []
+            for r, (seq, m) in zip(self._keys, self._ents):
+                if not pred(m):
+                    keys.append(r)
+                    ents.append((seq, m))
+            self._keys, self._ents = keys, ents
+            self._forget(out)
+        return out
+
+    def drop(self, pred: Callable[[Moving], bool]):
+        # konumlara dokunmadan cikar: baska segmente gecmis item'lar icin
+        keys, ents, gone = [], [], []
+        for r, e in zip(self._keys, self._ents):
+            if not pred(e[1]):
+                keys.append(r)
+                ents.append(e)
+            else:
+                gone.append(e[1])
+        self._keys, self._ents = keys, ents
+        self._forget(gone)
+
+    def _forget(self, items: Iterable[Moving]):
+        rel = self._rel
+        for m in items:
+            del rel[m.id]
+        if not self._keys:
+            self._rel = {}      # bosalan dict kapasitesini birakmaz
+
+    def pos_of(self, m: Moving) -> float:
+        # tek item icin gercek konum (m.pos yalnizca gezinirken tazelenir)
+        return (self._rel[m.id] + self.phase.at()) % self.length
+
+    def get_state(self) -> Dict[str, object]:
+        seq = next(self._seq)
+        self._seq = count(seq)
+        return {
+            "phase": self.phase.get_state(), "speed": self.speed, "seq": seq,
+            "keys": array("d", self._keys).tobytes(),
+            "seqs": array("q", (e[0] for e in self._ents)).tobytes(),
+            "items": pack_items(e[1] for e in self._ents),
+        }
+
+    def set_state(self, st: Dict[str, object]):
+        self.phase.set_state(st["phase"])
+        self.speed = st["speed"]
+        self._seq = count(st["seq"])
+        self._keys = array("d", st["keys"]).tolist()
+        self._ents = list(zip(array("q", st["seqs"]).tolist(), unpack_items(st["items"])))
+        self._rel = {m.id: r for r, (_, m) in zip(self._keys, self._ents)}
+
+    def cut(self, lo: float, hi: float) -> List[Tuple[float, int, Moving]]:
+        # [lo, hi] (dairesel) penceresini cikar; varis sirasi: lo'dan itibaren artan r
+        keys, ents = self._keys, self._ents
+        if lo <= hi:
+            a, b = bisect_left(keys, lo), bisect_right(keys, hi)
+            out = list(zip(keys[a:b], ents[a:b]))
+            del keys[a:b], ents[a:b]
+        else:
+            a, b = bisect_left(keys, lo), bisect_right(keys, hi)
+            out = list(zip(keys[a:], ents[a:])) + list(zip(keys[:b], ents[:b]))
+            del keys[a:], ents[a:]
+            del keys[:b], ents[:b]
+        self._forget(m for _, (_, m) in out)
+        return [(r, seq, m) for r, (seq, m) in out]
+
+    def step(self, speed: float, dt: float) -> List[Moving]:
+        d = speed * dt
+        self.speed = speed
+        self.phase.step(d)
+        if d <= 0 or not self._keys:
+            return []
+        lo, hi = self.phase.window(0)
+        out = self.cut(lo, hi)
+        ph = self.phase.at()
+        for r, _, m in out:
+            m.pos = (r + ph) % self.length
+        return [m for _, _, m in out]
@@ -0,0 +1,201 @@
+import multiprocessing as mp
+import weakref
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from config import BELTS_R, BELTS_C
+from soa import Columns, SoAConveyorSystem, SERP, SERP_RANK, _concat, step_bank
+
+# Paralel bant bankasi isci sureclere bolunur. Her parca (shard) kendi
+# bantlarinin sutunlarini paylasimli bellekte tutar; ana surec bos
+# zamanda (isciler beklerken) bu sutunlara dogrudan yazar (LOAD -> bant),
+# isciler tick'te yalnizca bantlari ilerletir ve cikanlari (bant -> L2)
+# ayni bloktaki cikis kutusuna yazar. Tick basina tasinan tek sey
+# adim parametreleri ve cikis sayisidir.
+
+N_BELTS = BELTS_R * BELTS_C
+_W = len(Columns.FIELDS)            # tum alanlar 8 bayt
+_HDR = 2                            # n, cikis kutusundaki item sayisi
+
+
+class ShmColumns(Columns):
+    # Columns arayuzu, sabit kapasiteli paylasimli bellek uzerinde
+    def __init__(self, shm: SharedMemory, cap: int):
+        self.shm = shm
+        self.cap = cap
+        buf = shm.buf
+        self._hdr = np.ndarray((_HDR,), dtype=np.int64, buffer=buf)
+        off = 8 * _HDR
+        self._out = {}
+        for box in ("", "out"):
+            for f, dt in zip(self.FIELDS, self.DTYPES):
+                arr = np.ndarray((cap,), dtype=dt, buffer=buf, offset=off)
+                off += 8 * cap
+                if box:
+                    self._out[f] = arr
+                else:
+                    self.__dict__["_" + f] = arr
+
+    @staticmethod
+    def nbytes(cap: int) -> int:
+        return 8 * (_HDR + 2 * _W * cap)
+
+    @property
+    def n(self) -> int:
+        return int(self._hdr[0])
+
+    @n.setter
+    def n(self, k: int):
+        self._hdr[0] = k
+
+    def _reserve(self, k: int):
+        if self.n + k > self.cap:
+            raise RuntimeError(f"bant parcasi dolu: kapasite {self.cap}")
+
+    def _shrink(self):
+        # paylasimli blok sabit boyutlu; kuculmez
+        pass
+
+    def post(self, cols: Optional[Dict[str, np.ndarray]]) -> int:
+        k = 0 if cols is None else len(cols["id"])
+        for f in self.FIELDS:
+            if k:
+                self._out[f][:k] = cols[f]
+        self._hdr[1] = k
+        return k
+
+    def outbox(self) -> Dict[str, np.ndarray]:
+        k = int(self._hdr[1])
+        return {f: self._out[f][:k].copy() for f in self.FIELDS}
+
+    def release(self):
+        # shm.close() icin once tum numpy gorunumleri birakilmali
+        for f in self.FIELDS:
+            self.__dict__.pop("_" + f, None)
+        self._out = {}
+        self._hdr = None
+
+
+def _serve(conn, name: str, cap: int):
+    shm = SharedMemory(name=name)
+    cols = ShmColumns(shm, cap)
+    try:
+        while True:
+            msg = conn.recv()
+            if msg is None:
+                break
+            conn.send(cols.post(step_bank(cols, *msg)) if len(cols) else cols.post(None))
+    finally:
+        cols.release()
+        shm.close()
+
+
+class ShardedBelts:
+    # SoA motorunun self.belts'ine ayni arayuz: bant no -> parca
+    def __init__(self, shards: List[ShmColumns]):
+        self.shards = shards
+        k = len(shards)
+        self.shard_of = np.zeros(N_BELTS + 1, dtype=np.int64)
+        self.shard_of[SERP] = np.arange(N_BELTS) * k // N_BELTS
+
+    def __len__(self) -> int:
+        return sum(len(s) for s in self.shards)
+
+    def __getattr__(self, name: str):
+        if name in Columns.FIELDS:
+            return np.concatenate([getattr(s, name) for s in self.__dict__["shards"]])
+        raise AttributeError(name)
+
+    def extend(self, id, pos, created_at, entered_area_at, belt=0):
+        k = np.size(id)
+        if k == 0:
+            return
+        vals = [np.broadcast_to(np.asarray(v), (k,)) for v in (id, pos, created_at, entered_area_at, belt)]
+        where = self.shard_of[vals[4]]
+        for i, s in enumerate(self.shards):
+            m = where == i
+            if m.any():
+                s.extend(*(v[m] for v in vals))
+
+    def select(self, idx) -> Dict[str, np.ndarray]:
+        return {f: getattr(self, f)[idx] for f in Columns.FIELDS}
+
+    def take_all(self) -> Dict[str, np.ndarray]:
+        cols = _concat(*(s.select(slice(None)) for s in self.shards))
+        self.clear()
+        return cols
+
+    def clear(self):
+        for s in self.shards:
+            s.clear()
+
+    def get_state(self) -> Dict[str, bytes]:
+        return {f: getattr(self, f).tobytes() for f in Columns.FIELDS}
+
+    def set_state(self, st: Dict[str, bytes]):
+        self.clear()
+        self.extend(*(np.frombuffer(st[f], dtype=dt) for f, dt in zip(Columns.FIELDS, Columns.DTYPES)))
+
+
+class ShardedConveyorSystem(SoAConveyorSystem):
+    def __init__(self, engine: str = "sharded", seed: Optional[int] = None,
+                 shards: int = 2, capacity: int = 1 << 16):
+        super().__init__(engine, seed)
+        ctx = mp.get_context()
+        blocks, conns, procs = [], [], []
+        for _ in range(shards):
+            shm = SharedMemory(create=True, size=ShmColumns.nbytes(capacity))
+            parent, child = ctx.Pipe()
+            p = ctx.Process(target=_serve, args=(child, shm.name, capacity), daemon=True)
+            p.start()
+            child.close()
+            blocks.append(shm)
+            conns.append(parent)
+            procs.append(p)
+        self.belts = ShardedBelts([ShmColumns(shm, capacity) for shm in blocks])
+        self._conns = conns
+        self._finalizer = weakref.finalize(self, _shutdown, self.belts.shards, blocks, conns, procs)
+
+    def _step_belts(self):
+        shards = self.belts.shards
+        busy = [i for i, s in enumerate(shards) if len(s)]
+        if not busy:
+            return
+        msg = (self._speed_for("B") or 0.0, self.mode == "DRAIN", self._ignore_gaps, self._belt_gap)
+        for i in busy:
+            self._conns[i].send(msg)
+        parts = [shards[i].outbox() for i in busy if self._conns[i].recv()]
+        if not parts:
+            return
+        cols = _concat(*parts) if len(parts) > 1 else parts[0]
+        # parcalar ayri bant kumeleri tutar; tek surecli cikis sirasi = bant sirasi
+        order = np.argsort(SERP_RANK[cols["belt"]], kind="stable")
+        self._belts_exited({f: v[order] for f, v in cols.items()})
+
+    def close(self):
+        self._finalizer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _shutdown(shards, blocks, conns, procs):
+    for c in conns:
+        try:
+            c.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+    for p in procs:
+        p.join(timeout=5)
+        if p.is_alive():
+            p.terminate()
+    for s in shards:
+        s.release()
+    for shm in blocks:
+        shm.close()
+        shm.unlink()
@@ -0,0 +1,541 @@
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from config import (
+    BELTS_R, BELTS_C, DT,
+    BELT_LEN_M, LINE2_LEN_M, UNL_LEN_M,
+    SEG_LOAD, SEG_L1, SEG_L2, SEG_U1, SEG_U2, TOPOLOGY
+)
+from eventbus import EV_LOAD_BELT, EV_BELT_L2, EV_L2_UNL, EV_HANG, EV_LIFO, SEG_DONE
+from moving import seg_name
+from segments import Phase
+from system import ConveyorSystem, SERP_ORDER, HANG_TARGETS, N_SEGS, ADVANCE_MIN_TICKS
+
+N_BELTS = BELTS_R * BELTS_C
+SEGMENTS = ("load_loop", "line1", "belts", "line2", "unl1", "unl2")
+SERP = np.asarray(SERP_ORDER, dtype=np.int64)
+# belt no -> sira (serpentine icindeki index)
+SERP_RANK = np.zeros(N_BELTS + 1, dtype=np.int64)
+SERP_RANK[SERP] = np.arange(N_BELTS)
+_SEG_ATTR = {SEG_LOAD: "load_loop", SEG_L1: "line1", SEG_L2: "line2", SEG_U1: "unl1", SEG_U2: "unl2"}
+
+
+class Columns:
+    FIELDS = ("id", "pos", "created_at", "entered_area_at", "belt")
+    DTYPES = (np.int64, np.float64, np.float64, np.float64, np.int64)
+    # id -> satir (sistemin row_of dizisi); satirlari tasiyan her islem gunceller
+    rows: Optional[np.ndarray] = None
+
+    def __init__(self, cap: int = 64):
+        self.n = 0
+        self.cap0 = cap
+        self._alloc(cap)
+
+    def _alloc(self, cap: int):
+        for f, dt in zip(self.FIELDS, self.DTYPES):
+            setattr(self, "_" + f, np.zeros(cap, dtype=dt))
+
+    def _shrink(self):
+        # bosalan sutun patlamadan kalan kapasiteyi tutmasin (dongu bosaltilinca)
+        if self.n == 0 and len(self._id) > 16 * self.cap0:
+            self._alloc(self.cap0)
+
+    def __len__(self) -> int:
+        return self.n
+
+    def __getattr__(self, name: str):
+        if name in Columns.FIELDS:
+            return self.__dict__["_" + name][:self.n]
+        raise AttributeError(name)
+
+    def _reserve(self, k: int):
+        need = self.n + k
+        cap = len(self._id)
+        if need <= cap:
+            return
+        while cap < need:
+            cap *= 2
+        for f in self.FIELDS:
+            old = getattr(self, "_" + f)
+            new = np.zeros(cap, dtype=old.dtype)
+            new[:self.n] = old[:self.n]
+            setattr(self, "_" + f, new)
+
+    def extend(self, id, pos, created_at, entered_area_at, belt=0):
+        k = np.size(id)
+        if k == 0:
+            return
+        self._reserve(k)
+        s = slice(self.n, self.n + k)
+        self._id[s] = id
+        self._pos[s] = pos
+        self._created_at[s] = created_at
+        self._entered_area_at[s] = entered_area_at
+        self._belt[s] = belt
+        if self.rows is not None:
+            self.rows[id] = np.arange(self.n, self.n + k) if np.ndim(id) else self.n
+        self.n += k
+
+    def select(self, idx) -> Dict[str, np.ndarray]:
+        return {f: getattr(self, f)[idx] for f in self.FIELDS}
+
+    def keep(self, idx):
+        cols = self.select(idx)
+        k = len(cols["id"])
+        for f in self.FIELDS:
+            getattr(self, "_" + f)[:k] = cols[f]
+        self.n = k
+        if self.rows is not None:
+            self.rows[cols["id"]] = np.arange(k)
+        self._shrink()
+
+    def get_state(self) -> Dict[str, bytes]:
+        return {f: getattr(self, f).tobytes() for f in self.FIELDS}
+
+    def set_state(self, st: Dict[str, bytes]):
+        # id alani henuz ayrilmamis olabilir; satir indeksi sonra _reindex'te kurulur
+        rows, self.rows = self.rows, None
+        self.clear()
+        self.extend(*(np.frombuffer(st[f], dtype=dt) for f, dt in zip(self.FIELDS, self.DTYPES)))
+        self.rows = rows
+
+    def take_all(self) -> Dict[str, np.ndarray]:
+        cols = {f: getattr(self, f).copy() for f in self.FIELDS}
+        self.n = 0
+        self._shrink()
+        return cols
+
+    def clear(self):
+        self.n = 0
+
+
+def _concat(*parts: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    return {f: np.concatenate([p[f] for p in parts]) for f in Columns.FIELDS}
+
+
+def step_bank(seg: Columns, sp: float, allow_exit: bool, ignore_gaps: bool,
+              gap: float) -> Optional[Dict[str, np.ndarray]]:
+    # paralel bant bankasini bir tick ilerlet; cikanlari (bant sirasinda) dondur.
+    # Bantlar birbirinden bagimsiz: bankanin herhangi bir bant alt kumesi ayni sonucu verir.
+    order = np.lexsort((-seg.pos, SERP_RANK[seg.belt]))
+    if not (order[1:] > order[:-1]).all():
+        # bosluk kurali sirayi korur; yeniden siralama yalnizca yeni girenlerden sonra
+        seg.keep(order)
+    rank = SERP_RANK[seg.belt]
+    lead = np.ones(len(seg), dtype=bool)
+    lead[1:] = rank[1:] != rank[:-1]
+    target = seg.pos + sp * DT
+    lead_pos = target[lead] if allow_exit else np.minimum(target[lead], BELT_LEN_M)
+    if ignore_gaps:
+        new = np.maximum(0.0, target)
+        new[lead] = lead_pos
+    else:
+        # bant ici siralama bagimliligi: ust sinirdan baslayip sabit noktaya kadar gevset
+        new = target.copy()
+        new[lead] = lead_pos
+        max_pos = np.empty_like(new)
+        while True:
+            max_pos[1:] = new[:-1] - gap
+            if not allow_exit:
+                np.minimum(max_pos, BELT_LEN_M, out=max_pos)
+            nxt = np.maximum(0.0, np.minimum(target, max_pos))
+            nxt[lead] = lead_pos
+            if np.array_equal(nxt, new):
+                break
+            new = nxt
+    seg.pos[:] = new
+    if allow_exit:
+        out = new >= BELT_LEN_M - 1e-9
+        if out.any():
+            cols = seg.select(out)
+            seg.keep(~out)
+            return cols
+    return None
+
+
+class SoAConveyorSystem(ConveyorSystem):
+    def __init__(self, engine: str = "numpy", seed: Optional[int] = None):
+        if not TOPOLOGY.simple:
+            raise ValueError("numpy motoru yalnizca tek donguden tum bantlari besleyen topolojiyi destekler")
+        super().__init__(engine, seed)
+        # yukleme dongusunde pos sutunu faza gore goreli konumdur (bkz. LoadLoop)
+        self.load_loop = Columns()
+        loop = TOPOLOGY.loops[0]
+        self._phase = Phase(loop.length, loop.switch_pos)
+        self.line1 = Columns()
+        self.belts = Columns(256)
+        self.line2 = Columns()
+        self.unl1 = Columns()
+        self.unl2 = Columns()
+        # id ile indekslenen barkodlar (ItemTable.barcode gibi); bosaltilinca ""
+        self.barcodes: List[str] = [""]
+        # yalnizca bant sayaclari tutulur; sutun uzunluklari zaten O(1)
+        self.occ = np.zeros(N_SEGS, dtype=np.int64)
+        # id -> segment ve segment icindeki satir
+        self.seg_of = np.full(1024, SEG_DONE, dtype=np.int16)
+        self.row_of = np.zeros(1024, dtype=np.int64)
+        self._attach_rows()
+
+    def _worst_remaining(self, parked: bool = True) -> float:
+        worst = 0.0
+        if parked and (len(self.load_loop) or len(self.line1)):
+            worst = LINE2_LEN_M + UNL_LEN_M + BELT_LEN_M
+        if len(self.belts):
+            worst = max(worst, max(0.0, BELT_LEN_M - float(self.belts.pos.min())) + LINE2_LEN_M + UNL_LEN_M)
+        if len(self.line2):
+            worst = max(worst, max(0.0, LINE2_LEN_M - float(self.line2.pos.min())) + UNL_LEN_M)
+        for seg in (self.unl1, self.unl2):
+            if len(seg):
+                worst = max(worst, max(0.0, UNL_LEN_M - float(seg.pos.min())))
+        return worst
+
+    def _hang_to_belts(self, cols: Dict[str, np.ndarray], src):
+        k = len(cols["id"])
+        belt = np.asarray(self.rng.belt.take(k), dtype=np.int64)
+        pos = np.asarray(self.rng.pos.take(k)) * BELT_LEN_M
+        if self.bus is not None:
+            self.bus.emit_many(EV_HANG, self.t, cols["id"], src, belt)
+        self.belts.extend(cols["id"], pos, cols["created_at"], self.t, belt)
+        np.add.at(self.occ, belt, 1)
+        self.seg_of[cols["id"]] = belt
+        self.hanged_ids.update(cols["id"].tolist())
+
+    def pick_and_hang(self):
+        if not self.load_loop:
+            return
+        take = self.load_loop.take_all()
+        k = len(take["id"])
+        target = np.asarray(self.rng.target.take(k))
+        u = np.asarray(self.rng.pos.take(k))
+        is_belt = target == HANG_TARGETS.index("BELT")
+        belt = np.zeros(k, dtype=np.int64)
+        belt[is_belt] = self.rng.belt.take(int(is_belt.sum()))
+        dst = np.choose(target, [np.full(k, SEG_L1), belt, np.full(k, SEG_LOAD)])
+        self.seg_of[take["id"]] = dst
+        if self.bus is not None:
+            self.bus.emit_many(EV_HANG, self.t, take["id"], SEG_LOAD, dst)
+        for seg, name, length in ((self.line1, "L1", LINE2_LEN_M), (self.belts, "BELT", BELT_LEN_M),
+                                  (self.load_loop, "LOAD", self._phase.length)):
+            idx = np.flatnonzero(target == HANG_TARGETS.index(name))
+            if not len(idx):
+                continue
+            pos = u[idx] * length
+            if seg is self.load_loop:
+                pos = (pos - self._phase.at()) % self._phase.length
+            seg.extend(take["id"][idx], pos, take["created_at"][idx], self.t, belt[idx])
+            if seg is self.belts:
+                np.add.at(self.occ, belt[idx], 1)
+        self.hanged_ids.update(take["id"].tolist())
+
+    def _enter_hang(self):
+        self._switch_mode("HANG")
+        self.hang_started_at = self.t
+        self._ignore_gaps = False
+        src = np.repeat([SEG_L2, SEG_U1, SEG_U2], [len(self.line2), len(self.unl1), len(self.unl2)])
+        carry = _concat(self.line2.take_all(), self.unl1.take_all(), self.unl2.take_all())
+        self._hang_to_belts(carry, src)
+
+    def toggle_mode(self):
+        if self.mode != "DRAIN":
+            l1 = self.line1.take_all()
+            # liste motoruyla ayni esitlik bozucu: bant no sirasi, bant icinde lider once.
+            # Ayni tick'te askiya alinan item'lar henuz step_bank'te siralanmadi
+            belts = self.belts.select(np.lexsort((-self.belts.pos, self.belts.belt)))
+            self.belts.clear()
+            self.occ[1:N_BELTS + 1] = 0
+            hanged = np.isin(self.load_loop.id, np.fromiter(self.hanged_ids, dtype=np.int64))
+            load = self.load_loop.select(hanged)
+            self.load_loop.keep(~hanged)
+            lifo = _concat(l1, belts, load)
+            order = np.argsort(-lifo["entered_area_at"], kind="stable")
+            spacing = 0.1
+            pos = np.minimum(LINE2_LEN_M - 1e-6, np.arange(len(order)) * spacing)
+            self.line2.extend(lifo["id"][order], pos, lifo["created_at"][order], self.t)
+            self.seg_of[lifo["id"]] = SEG_L2
+            if self.bus is not None:
+                src = np.concatenate([np.full(len(l1["id"]), SEG_L1), belts["belt"],
+                                      np.full(len(load["id"]), SEG_LOAD)])
+                self.bus.emit_many(EV_LIFO, self.t, lifo["id"][order], src[order], SEG_L2)
+            self.hanged_ids.clear()
+            self._switch_mode("DRAIN")
+            self.drain_started_at = self.t
+            self._ignore_gaps = True
+            self._compute_and_set_drain_speeds()
+        else:
+            self._switch_mode("COLLECT")
+            self._ignore_gaps = False
+
+    def _step_load_loop(self):
+        seg = self.load_loop
+        sp = self._speed_for("LOAD") or 0.0
+        self._phase.step(sp * DT)
+        if sp <= 0 or not seg:
+            return
+        lo, hi = self._phase.window(0)
+        r = seg.pos
+        upper = r >= lo
+        if lo <= hi:
+            crossed = upper & (r <= hi)
+        else:
+            crossed = upper | (r <= hi)
+        arrived = np.flatnonzero(crossed)
+        if not len(arrived):
+            return
+        arrived = arrived[np.lexsort((r[arrived], ~upper[arrived]))]
+        cols = seg.select(arrived)
+        seg.keep(~crossed)
+        if self.mode == "HANG":
+            self._hang_to_belts(cols, SEG_LOAD)
+        else:
+            k = len(arrived)
+            belt = SERP[(self.feed_rr[0] + np.arange(k)) % N_BELTS]
+            self.feed_rr[0] += k
+            if self.bus is not None:
+                self.bus.emit_many(EV_LOAD_BELT, self.t, cols["id"], SEG_LOAD, belt)
+            self.belts.extend(cols["id"], 0.0, cols["created_at"], self.t, belt)
+            np.add.at(self.occ, belt, 1)
+            self.seg_of[cols["id"]] = belt
+
+    def _step_belts(self):
+        if not self.belts:
+            return
+        cols = step_bank(self.belts, self._speed_for("B") or 0.0, self.mode == "DRAIN",
+                         self._ignore_gaps, self._belt_gap)
+        if cols is not None:
+            self._belts_exited(cols)
+
+    def _belts_exited(self, cols: Dict[str, np.ndarray]):
+        # bant sirasinda (SERP_RANK) bantlardan L2'ye gecenler
+        np.subtract.at(self.occ, cols["belt"], 1)
+        if self.bus is not None:
+            self.bus.emit_many(EV_BELT_L2, self.t, cols["id"], cols["belt"], SEG_L2)
+        self.line2.extend(cols["id"], 0.0, cols["created_at"], self.t)
+        self.seg_of[cols["id"]] = SEG_L2
+
+    def _step_line2(self):
+        seg = self.line2
+        if not seg:
+            return
+        seg.pos[:] += self._speed_for("L2") * DT
+        done = seg.pos >= LINE2_LEN_M - 1e-9
+        if not done.any():
+            return
+        cols = seg.select(done)
+        seg.keep(~done)
+        k = len(cols["id"])
+        to_u1 = ((self.rr + np.arange(k)) % 2) == 0
+        self.rr += k
+        if self.bus is not None:
+            self.bus.emit_many(EV_L2_UNL, self.t, cols["id"], SEG_L2, np.where(to_u1, SEG_U1, SEG_U2))
+        self.unl1.extend(cols["id"][to_u1], 0.0, cols["created_at"][to_u1], self.t)
+        self.unl2.extend(cols["id"][~to_u1], 0.0, cols["created_at"][~to_u1], self.t)
+        self.seg_of[cols["id"]] = np.where(to_u1, SEG_U1, SEG_U2)
+
+    def _step_unloads(self):
+        for seg, name in ((self.unl1, "U1"), (self.unl2, "U2")):
+            if not seg:
+                continue
+            seg.pos[:] += self._speed_for(name) * DT
+            done = seg.pos >= UNL_LEN_M - 1e-9
+            if not done.any():
+                continue
+            ids = seg.id[done].tolist()
+            seg.keep(~done)
+            self.seg_of[ids] = SEG_DONE
+            for iid in ids:
+                self._release(iid)
+            self._record_unloads(ids, name)
+
+    def run_events(self, seconds: float):
+        # olay motoru liste segmentleri uzerinde calisir; burada tick'lere dus
+        for _ in range(int(round(seconds / DT))):
+            self.tick()
+
+    def advance(self, seconds: float):
+        # HANG kapali formda (_advance_hang); COLLECT/DRAIN tick tick
+        n = int(round(seconds / DT))
+        if self.commands is not None and n >= ADVANCE_MIN_TICKS:
+            self.commands.drain(self)
+        if n < ADVANCE_MIN_TICKS or self.mode != "HANG":
+            self.run_events(seconds)
+        else:
+            self._advance_hang(n)
+        self._flush_unloads_due()
+
+    def _advance_hang(self, n: int):
+        # tick motoruyla ayni sira: j. tick'te swapper'i gecenler asilir, sonra
+        # bantlar adimlanir. HANG'de bant hizi 0, adim yalnizca sikistirir ve
+        # idempotenttir: ilk tick ve varis tick'leri disindakiler atlanir.
+        k0 = self.k
+        seg, ph = self.load_loop, self._phase
+        sp = self._speed_for("LOAD") or 0.0
+        ph.set_step(sp * DT)
+        rows, ticks, part = [], [], []
+        if sp > 0:
+            for i, r in enumerate(seg.pos.tolist()):
+                j = ph.crossing_step(r)
+                if j <= n:
+                    lo, hi = ph.window(j)
+                    rows.append(i)
+                    ticks.append(j)
+                    part.append(0 if lo <= hi or r >= lo else 1)
+        rows = np.asarray(rows, dtype=np.int64)
+        ticks = np.asarray(ticks, dtype=np.int64)
+        # tick icinde _step_load_loop'un sirasi: ust parca once, sonra r
+        order = np.lexsort((rows, seg.pos[rows], part, ticks))
+        rows, ticks = rows[order], ticks[order]
+        cols = seg.select(rows)
+        crossed = np.zeros(len(seg), dtype=bool)
+        crossed[rows] = True
+        seg.keep(~crossed)
+        if not len(rows) or ticks[0] > 1:
+            self._at_tick(k0 + 1)
+            self._step_belts()
+        bounds = np.flatnonzero(np.diff(ticks)) + 1
+        for a, b in zip(np.r_[0, bounds], np.r_[bounds, len(rows)]):
+            if a == b:
+                continue
+            self._at_tick(k0 + int(ticks[a]))
+            self._hang_to_belts({f: v[a:b] for f, v in cols.items()}, SEG_LOAD)
+            self._step_belts()
+        ph.steps += n
+        self._at_tick(k0 + n)
+
+    def _segments_state(self) -> Dict[str, object]:
+        st = {name: getattr(self, name).get_state() for name in SEGMENTS}
+        st["phase"] = self._phase.get_state()
+        st["barcodes"] = {iid: self.barcodes[iid] for iid in self._live_ids()}
+        return st
+
+    def _set_segments_state(self, st: Dict[str, object]):
+        for name in SEGMENTS:
+            getattr(self, name).set_state(st[name])
+        self._phase.set_state(st["phase"])
+        codes = st["barcodes"]
+        self.barcodes = [""] * max(self.next_id, max(codes, default=0) + 1)
+        for iid, code in codes.items():
+            self.barcodes[iid] = code
+        self._recount()
+        self._reindex()
+
+    def _release(self, iid: int):
+        code = self.barcodes[iid]
+        self.barcodes[iid] = ""
+        if self.by_barcode.get(code) == iid:
+            del self.by_barcode[code]
+
+    def _reindex(self):
+        self.seg_of = np.full(max(1024, self.next_id), SEG_DONE, dtype=np.int16)
+        for seg, code in ((self.load_loop, SEG_LOAD), (self.line1, SEG_L1), (self.line2, SEG_L2),
+                          (self.unl1, SEG_U1), (self.unl2, SEG_U2)):
+            self.seg_of[seg.id] = code
+        self.seg_of[self.belts.id] = self.belts.belt
+        self.row_of = np.zeros(len(self.seg_of), dtype=np.int64)
+        for name in SEGMENTS:
+            seg = getattr(self, name)
+            self.row_of[seg.id] = np.arange(len(seg))
+        self._attach_rows()
+        self.by_barcode = {self.barcodes[iid]: iid for iid in self._live_ids()}
+
+    def _live_ids(self) -> List[int]:
+        return np.flatnonzero(self.seg_of[:self.next_id] != SEG_DONE).tolist()
+
+    def lookup(self, iid: int) -> Optional[Dict[str, object]]:
+        s = int(self.seg_of[iid]) if 0 <= iid < len(self.seg_of) else SEG_DONE
+        if s == SEG_DONE:
+            return None
+        seg = self.belts if 1 <= s <= N_BELTS else getattr(self, _SEG_ATTR[s])
+        row = int(self.row_of[iid]) if getattr(seg, "rows", None) is not None else int(np.flatnonzero(seg.id == iid)[0])
+        pos = float(seg.pos[row])
+        if seg is self.load_loop:
+            pos = (pos + self._phase.at()) % self._phase.length
+        return {
+            "id": iid,
+            "barcode": self.barcodes[iid],
+            "seg": seg_name(s),
+            "pos": pos,
+            "created_at": float(seg.created_at[row]),
+            "entered_area_at": float(seg.entered_area_at[row]),
+        }
+
+    def _count_unloads(self, k: int, name: str):
+        return
+
+    def _load_items(self) -> int:
+        return len(self.load_loop)
+
+    def _belt_items(self) -> int:
+        return len(self.belts)
+
+    def _recount(self):
+        self.occ[:] = 0
+        self.occ[:N_BELTS + 1] = np.bincount(self.belts.belt, minlength=N_BELTS + 1)
+
+    def snapshot(self, per_belt: bool = False) -> Dict[str, object]:
+        snap = {
+            "mode": self.mode,
+            "t": self.t,
+            "in_load": len(self.load_loop),
+            "in_belts": len(self.belts),
+            "in_l1": len(self.line1),
+            "in_l2": len(self.line2),
+            "in_u1": len(self.unl1),
+            "in_u2": len(self.unl2),
+            "done": len(self.done_log),
+        }
+        if per_belt:
+            snap["belts"] = self.belt_occupancy()
+        return snap
+
+    def add_item_from_barcode(self, barcode: str, station: int = 1):
+        self._reserve_ids(self.next_id + 1)
+        self.load_loop.extend(
+            self.next_id,
+            self._phase.rel(TOPOLOGY.station(station)[1]),
+            self.t, self.t
+        )
+        self.barcodes.append(barcode)
+        self.by_barcode[barcode] = self.next_id
+        self.seg_of[self.next_id] = SEG_LOAD
+        self.next_id += 1
+        self.log.info("barcode_added", "[OK] Barkod {barcode} sisteme eklendi. in_load: {in_load}",
+                      barcode=barcode, in_load=len(self.load_loop))
+
+    def add_items_from_barcodes(self, barcodes: Iterable[str], station: int = 1) -> List[int]:
+        codes = list(barcodes)
+        n = len(codes)
+        if not n:
+            return []
+        ids = range(self.next_id, self.next_id + n)
+        rel = self._phase.rel(TOPOLOGY.station(station)[1])
+        self._reserve_ids(ids.stop)
+        self.load_loop.extend(np.arange(ids.start, ids.stop), rel, self.t, self.t)
+        self.barcodes.extend(codes)
+        self.by_barcode.update(zip(codes, ids))
+        self.seg_of[ids.start:ids.stop] = SEG_LOAD
+        self.next_id += n
+        self.log.info("barcodes_added", "[OK] {n} barkod sisteme eklendi. in_load: {in_load}",
+                      n=n, in_load=len(self.load_loop))
+        return list(ids)
+
+    def _reserve_ids(self, need: int):
+        cap = len(self.seg_of)
+        if need <= cap:
+            return
+        while cap < need:
+            cap *= 2
+        grown = np.full(cap, SEG_DONE, dtype=np.int16)
+        grown[:len(self.seg_of)] = self.seg_of
+        self.seg_of = grown
+        rows = np.zeros(cap, dtype=np.int64)
+        rows[:len(self.row_of)] = self.row_of
+        self.row_of = rows
+        self._attach_rows()
+
+    def _attach_rows(self):
+        # paylasimli bellekteki parcalar (sharded) kendi isci sureclerinde siralanir: indekslenmez
+        for name in SEGMENTS:
+            seg = getattr(self, name)
+            if isinstance(seg, Columns):
+                seg.rows = self.row_of
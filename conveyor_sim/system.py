@@ -1,62 +1,130 @@
-import random
-from typing import List, Dict, Callable, Optional
+from array import array
+from itertools import chain, repeat
+from typing import Iterable, List, Dict, Callable, Optional, Tuple
 
 from config import (
     BELTS_R, BELTS_C, DT,
     SPEED_COLLECT, SPEED_DRAIN, SPEED_LINE2_DRAIN,
-    LOAD_LOOP_LEN_M, SW_POS_M, STATION_POS_M,
     BELT_LEN_M, LINE2_LEN_M, UNL_LEN_M,
-    SPAWN_RATES, HANG_DURATION_S, DRAIN_WINDOW_S
+    SPAWN_RATES, HANG_DURATION_S, DRAIN_WINDOW_S,
+    SEG_L1, SEG_L2, SEG_U1, SEG_U2, SEG_LOADS, TOPOLOGY
 )
-from ordering import serpentine_order
-from moving import Moving
+from moving import Moving, ItemTable, pack_items, unpack_items, seg_name
+from commands import CommandQueue
+from eventbus import (
+    EventBus, EV_LOAD_BELT, EV_BELT_L2, EV_L2_UNL, EV_UNLOAD, EV_HANG, EV_LIFO, SEG_DONE
+)
+from logsink import LOG
+from rng import RngStreams
+from segments import BeltQueue, FifoLine, LoadLoop
+
+# bant isleme sirasi ve sira tablosu topolojiden derlenir
+SERP_ORDER = TOPOLOGY.belt_order
+SERP_RANK = TOPOLOGY.belt_rank
 
-SERP_ORDER = serpentine_order(BELTS_R, BELTS_C)
+ENGINES = ("list", "numpy", "sharded")
+HANG_TARGETS = ("L1", "BELT", "LOAD")
+ADVANCE_MIN_TICKS = 20
+N_SEGS = TOPOLOGY.n_segs
+# segment id -> 1 ise bant
+IS_BELT = bytes(1 if 1 <= s <= BELTS_R * BELTS_C else 0 for s in range(N_SEGS))
 
 class ConveyorSystem:
-    def __init__(self):
+    def __new__(cls, engine: str = "list", seed: Optional[int] = None, **kw):
+        assert engine in ENGINES
+        if cls is ConveyorSystem and engine == "numpy":
+            from soa import SoAConveyorSystem
+            cls = SoAConveyorSystem
+        elif cls is ConveyorSystem and engine == "sharded":
+            from shard import ShardedConveyorSystem
+            cls = ShardedConveyorSystem
+        return super().__new__(cls)
+
+    def __init__(self, engine: str = "list", seed: Optional[int] = None):
+        self.engine = engine
+        self.rng = RngStreams(seed, BELTS_R * BELTS_C, len(HANG_TARGETS))
+        self.log = LOG
+        self.bus: Optional[EventBus] = None
+        self.commands: Optional[CommandQueue] = None
+        self.profiler = None            # enable_profiling(); kapaliyken tick'e dokunmaz
         self.mode = "COLLECT"
         self.hang_started_at: Optional[float] = None
+        self.drain_started_at: Optional[float] = None
         self._ignore_gaps = False
         self._drain_speed_belts = SPEED_DRAIN
         self._drain_speed_line2 = SPEED_LINE2_DRAIN
         self.t = 0.0
+        self.k = 0              # tick sayaci; t = k * DT (toplama hatasi birikmez)
         self.next_id = 1
-        self.rr = 0
-        self.load_loop: List[Moving] = []
-        self.belts: Dict[int, List[Moving]] = {i: [] for i in range(1, BELTS_R*BELTS_C+1)}
+        self.rr = 0             # L2 -> U1/U2 sirasi
+        self.load_loops = [LoadLoop(lp.length, lp.switch_pos) for lp in TOPOLOGY.loops]
+        # dongu basina besleme sayaci: her dongu kendi bantlari uzerinde doner
+        self.feed_rr = [0] * len(self.load_loops)
+        self.load_loop = self.load_loops[0]
+        self._loop_of: Dict[int, LoadLoop] = dict(zip(SEG_LOADS, self.load_loops))
+        self.belts: Dict[int, BeltQueue] = {i: BeltQueue() for i in range(1, BELTS_R*BELTS_C+1)}
+        # item tasiyabilecek bantlar (bos olanlar _step_belts'te duser): tick
+        # maliyeti bant sayisiyla degil item'larla olceklenir
+        self._active: set[int] = set()
         self.line1: List[Moving] = []
-        self.line2: List[Moving] = []
-        self.unl1: List[Moving] = []
-        self.unl2: List[Moving] = []
+        self.line2 = FifoLine(LINE2_LEN_M)
+        self.unl1 = FifoLine(UNL_LEN_M)
+        self.unl2 = FifoLine(UNL_LEN_M)
         self.done_log: List[int] = []
+        self.meta = ItemTable()
         self.on_unloaded: Optional[Callable[[int, str, float], None]] = None
+        # toplu bildirim: pencere (0 = her tick) icindeki tum bitenler tek listede
+        self.on_unloaded_batch: Optional[Callable[[List[Tuple[int, str, float]]], None]] = None
+        self.unload_window_s = 0.0
+        self._unload_buf: List[Tuple[int, str, float]] = []
+        self._unload_k0 = 0
         self.hanged_ids: set[int] = set()
+        # canli doluluk: segment id -> item sayisi; her gecis gunceller
+        self.occ = array("q", bytes(8 * N_SEGS))
+        self.in_belts = 0
+        # id -> canli kayit; gecisler ayni nesneyi yeniden etiketledigi icin
+        # indeks yalnizca eklemede ve bosaltmada guncellenir. id'ler ardisik
+        # oldugundan dict yerine id ile indekslenen liste (ItemTable gibi);
+        # bosaltilan id'nin yuvasi None
+        self.index: List[Optional[Moving]] = [None]
+        self.by_barcode: Dict[str, int] = {}
         self._belt_gap = 0.35 * BELT_LEN_M
 
-    def _compute_and_set_drain_speeds(self):
-        def worst_remaining_distance(m: Moving) -> float:
-            if m.seg.startswith("B"):
-                return max(0.0, BELT_LEN_M - m.pos) + LINE2_LEN_M + UNL_LEN_M
-            if m.seg == "L2":
-                return max(0.0, LINE2_LEN_M - m.pos) + UNL_LEN_M
-            if m.seg in ("U1", "U2"):
-                return max(0.0, UNL_LEN_M - m.pos)
-            if m.seg in ("LOAD", "L1"):
-                return LINE2_LEN_M + UNL_LEN_M + BELT_LEN_M
-            return BELT_LEN_M + LINE2_LEN_M + UNL_LEN_M
-        all_items: List[Moving] = []
-        all_items += self.load_loop + self.line1
-        for b in self.belts.values():
-            all_items += b
-        all_items += self.line2 + self.unl1 + self.unl2
+    def _worst_remaining(self, parked: bool = True) -> float:
+        # her segment sirali tutuldugu icin en kotu item segmentin kuyrugudur: O(segment)
         worst = 0.0
-        for m in all_items:
-            worst = max(worst, worst_remaining_distance(m))
-        min_speed = worst / max(1e-6, DRAIN_WINDOW_S)
+        if parked and (any(self.load_loops) or self.line1):
+            worst = LINE2_LEN_M + UNL_LEN_M + BELT_LEN_M
+        for b in self._active:
+            seg = self.belts[b]
+            if seg:
+                worst = max(worst, max(0.0, BELT_LEN_M - seg.min_pos()) + LINE2_LEN_M + UNL_LEN_M)
+        if self.line2:
+            worst = max(worst, max(0.0, LINE2_LEN_M - self.line2.min_pos()) + UNL_LEN_M)
+        for line in (self.unl1, self.unl2):
+            if line:
+                worst = max(worst, max(0.0, UNL_LEN_M - line.min_pos()))
+        return worst
+
+    def _drain_speeds_for(self, worst: float, window: float):
+        min_speed = worst / max(1e-6, window)
         safety = 1.2
-        self._drain_speed_belts = max(SPEED_DRAIN, safety * min_speed)
-        self._drain_speed_line2 = max(SPEED_LINE2_DRAIN, safety * min_speed)
+        return max(SPEED_DRAIN, safety * min_speed), max(SPEED_LINE2_DRAIN, safety * min_speed)
+
+    def _drain_window_left(self) -> float:
+        if self.drain_started_at is None:
+            return DRAIN_WINDOW_S
+        return max(DT, DRAIN_WINDOW_S - (self.t - self.drain_started_at))
+
+    def _compute_and_set_drain_speeds(self):
+        self._drain_speed_belts, self._drain_speed_line2 = \
+            self._drain_speeds_for(self._worst_remaining(), self._drain_window_left())
+
+    def _retune_drain(self):
+        # DRAIN sirasinda LOAD/L1'deki item'lar hareket etmez; hedef, kalan sure
+        # icinde hareket edebilen item'larin bitmesi
+        self._drain_speed_belts, self._drain_speed_line2 = \
+            self._drain_speeds_for(self._worst_remaining(parked=False), self._drain_window_left())
 
     def _speed_for(self, seg: str) -> float:
         if self.mode == "COLLECT":
@@ -76,49 +144,48 @@ class ConveyorSystem:
             if seg in ("L1", "L2", "U1", "U2"): return 0.0
         return 0.0
 
+    def _transfer(self, m: Moving, seg: int, pos: float, speed: float, kind: int) -> Moving:
+        if self.bus is not None:
+            self.bus.emit(kind, self.t, m.id, m.seg, seg)
+        self.meta.entered_area_at[m.id] = self.t
+        occ = self.occ
+        occ[m.seg] -= 1
+        occ[seg] += 1
+        if IS_BELT[seg]:
+            self.in_belts += 1
+            self._active.add(seg)
+        if IS_BELT[m.seg]:
+            self.in_belts -= 1
+        return m.move_to(seg, pos, speed)
+
     def pick_and_hang(self):
-        if not self.load_loop:
+        if not any(self.load_loops):
             return
-        take = self.load_loop[:]
-        self.load_loop.clear()
-        for m in take:
-            choice = random.choice(["L1", "BELT", "LOAD"])
+        take = [m for loop in self.load_loops for m in loop.take_all()]
+        targets = [HANG_TARGETS[c] for c in self.rng.target.take(len(take))]
+        belts = iter(self.rng.belt.take(targets.count("BELT")))
+        for m, choice, u in zip(take, targets, self.rng.pos.take(len(take))):
             if choice == "L1":
-                pos = random.uniform(0.0, LINE2_LEN_M)
-                self.line1.append(Moving(
-                    m.id, "L1", pos, LINE2_LEN_M, 0.0,
-                    created_at=m.created_at, entered_area_at=self.t
-                ))
+                self.line1.append(self._transfer(m, SEG_L1, u * LINE2_LEN_M, 0.0, EV_HANG))
             elif choice == "BELT":
-                b = random.randint(1, BELTS_R * BELTS_C)
-                pos = random.uniform(0.0, BELT_LEN_M)
-                self.belts[b].append(Moving(
-                    m.id, f"B{b}", pos, BELT_LEN_M, 0.0,
-                    created_at=m.created_at, entered_area_at=self.t
-                ))
+                b = next(belts)
+                self.belts[b].push(self._transfer(m, b, u * BELT_LEN_M, 0.0, EV_HANG))
             else:
-                pos = random.uniform(0.0, LOAD_LOOP_LEN_M)
-                self.load_loop.append(Moving(
-                    m.id, "LOAD", pos, LOAD_LOOP_LEN_M, 0.0, wrap=True,
-                    created_at=m.created_at, entered_area_at=self.t
-                ))
+                loop = self._loop_of[m.seg]
+                loop.append(self._transfer(m, m.seg, u * loop.length, 0.0, EV_HANG))
             self.hanged_ids.add(m.id)
 
     def _enter_hang(self):
-        self.mode = "HANG"
+        self._switch_mode("HANG")
         self.hang_started_at = self.t
         self._ignore_gaps = False
-        carry = self.line2 + self.unl1 + self.unl2
+        carry = list(self.line2) + list(self.unl1) + list(self.unl2)
         self.line2.clear()
         self.unl1.clear()
         self.unl2.clear()
-        for m in carry:
-            b = random.randint(1, BELTS_R * BELTS_C)
-            pos = random.uniform(0.0, BELT_LEN_M)
-            self.belts[b].append(Moving(
-                m.id, f"B{b}", pos, BELT_LEN_M, 0.0,
-                created_at=m.created_at, entered_area_at=self.t
-            ))
+        k = len(carry)
+        for m, b, u in zip(carry, self.rng.belt.take(k), self.rng.pos.take(k)):
+            self.belts[b].push(self._transfer(m, b, u * BELT_LEN_M, 0.0, EV_HANG))
             self.hanged_ids.add(m.id)
         for seg in self.belts.values():
             for m in seg:
@@ -126,222 +193,374 @@ class ConveyorSystem:
 
     def toggle_mode(self):
         if self.mode != "DRAIN":
-            lifo: List[Moving] = []
-            lifo += [Moving(m.id, "L1", m.pos, LINE2_LEN_M, 0.0,
-                            created_at=m.created_at, entered_area_at=m.entered_area_at)
-                     for m in self.line1]
+            # esit entered_area_at'te (ayni tick'te askiya alinanlar) kararli siralama
+            # toplama sirasini korur: L1, bant no sirasi ve bant icinde lider once,
+            # sonra dongu. Numpy motoru ayni sirayi kurar.
+            lifo: List[Moving] = list(self.line1)
             self.line1.clear()
             for bidx in list(self.belts.keys()):
                 seg = self.belts[bidx]
-                for m in seg:
-                    lifo.append(Moving(m.id, m.seg, m.pos, m.length, 0.0,
-                                       created_at=m.created_at, entered_area_at=m.entered_area_at))
-                self.belts[bidx] = []
-            kept_load = []
-            for m in self.load_loop:
-                if m.id in self.hanged_ids:
-                    lifo.append(Moving(m.id, "LOAD", m.pos, LOAD_LOOP_LEN_M, 0.0, wrap=True,
-                                       created_at=m.created_at, entered_area_at=m.entered_area_at))
-                else:
-                    kept_load.append(m)
-            self.load_loop = kept_load
-            lifo.sort(key=lambda x: x.entered_area_at, reverse=True)
+                lifo.extend(seg)
+                seg.clear()
+            self._active.clear()
+            for loop in self.load_loops:
+                lifo += loop.extract(lambda m: m.id in self.hanged_ids)
+            entered = self.meta.entered_area_at
+            lifo.sort(key=lambda x: entered[x.id], reverse=True)
             spacing = 0.1
-            for i, m in enumerate(lifo):
-                p = min(LINE2_LEN_M - 1e-6, i * spacing)
-                self.line2.append(Moving(
-                    m.id, "L2", p, LINE2_LEN_M, 0.0,
-                    created_at=m.created_at, entered_area_at=self.t
-                ))
+            self.line2.extend(
+                self._transfer(m, SEG_L2, min(LINE2_LEN_M - 1e-6, i * spacing), 0.0, EV_LIFO)
+                for i, m in enumerate(lifo)
+            )
             self.hanged_ids.clear()
-            self.mode = "DRAIN"
+            self._switch_mode("DRAIN")
+            self.drain_started_at = self.t
             self._ignore_gaps = True
             self._compute_and_set_drain_speeds()
-            for m in self.load_loop: m.speed = self._speed_for("LOAD")
             for seg in self.belts.values():
                 for m in seg: m.speed = self._speed_for("B")
-            for m in self.line2: m.speed = self._speed_for("L2")
-            for m in self.unl1: m.speed = self._speed_for("U1")
-            for m in self.unl2: m.speed = self._speed_for("U2")
         else:
-            self.mode = "COLLECT"
+            self._switch_mode("COLLECT")
             self._ignore_gaps = False
 
+    def _switch_mode(self, mode: str):
+        if self.bus is not None and mode != self.mode:
+            self.bus.emit_mode(self.t, self.mode, mode)
+        self.mode = mode
+
     def set_mode(self, mode: str):
         assert mode in ("COLLECT", "DRAIN", "HANG")
         if mode == "HANG":
             self._enter_hang()
             return
-        self.mode = mode
+        if mode == "DRAIN" and self.mode != "DRAIN":
+            self.drain_started_at = self.t
+        self._switch_mode(mode)
         self._ignore_gaps = (mode == "DRAIN")
 
     def _step_load_loop(self):
-        if not self.load_loop:
-            return
+        # faz bos dongude de ilerler; goreli konumlar olay motoruyla birebir kalir
         sp = self._speed_for("LOAD") or 0.0
-        arrived: List[Moving] = []
-        for m in self.load_loop:
-            prev = m.pos
-            m.speed = sp
-            m.step(DT)
-            now = m.pos
-            crossed = False
-            if sp > 0:
-                if prev <= SW_POS_M <= now and now - prev <= LOAD_LOOP_LEN_M/2:
-                    crossed = True
-                if prev > now:
-                    if SW_POS_M >= prev or SW_POS_M <= now:
-                        crossed = True
-            if crossed:
-                arrived.append(m)
-        if not arrived:
-            return
-        arrived.sort(key=lambda x: x.pos)
-        for m in arrived:
-            if self.mode == "HANG":
-                b = random.randint(1, BELTS_R * BELTS_C)
-                pos = random.uniform(0.0, BELT_LEN_M)
-                self.belts[b].append(Moving(
-                    m.id, f"B{b}", pos, BELT_LEN_M, 0.0,
-                    created_at=m.created_at, entered_area_at=self.t
-                ))
-                self.hanged_ids.add(m.id)
-            else:
-                b = SERP_ORDER[self.rr % (BELTS_R * BELTS_C)]
-                self.rr += 1
-                self.belts[b].append(Moving(
-                    m.id, f"B{b}", 0.0, BELT_LEN_M, self._speed_for("B"),
-                    created_at=m.created_at, entered_area_at=self.t
-                ))
-        ids = {x.id for x in arrived}
-        self.load_loop = [m for m in self.load_loop if m.id not in ids]
+        for i, (loop, spec) in enumerate(zip(self.load_loops, TOPOLOGY.loops)):
+            feeds = spec.feeds
+            for m in loop.step(sp, DT):
+                if self.mode == "HANG":
+                    b = self.rng.belt.one()
+                    pos = self.rng.pos.one() * BELT_LEN_M
+                    self.belts[b].push(self._transfer(m, b, pos, 0.0, EV_HANG))
+                    self.hanged_ids.add(m.id)
+                else:
+                    b = feeds[self.feed_rr[i] % len(feeds)]
+                    self.feed_rr[i] += 1
+                    self.belts[b].push(self._transfer(m, b, 0.0, self._speed_for("B"), EV_LOAD_BELT))
 
     def _step_belts(self):
         sp = self._speed_for("B") or 0.0
         allow_exit = (self.mode == "DRAIN")
         GAP = self._belt_gap
         ignore_gaps = self._ignore_gaps
-        for idx in SERP_ORDER:
+        active = self._active
+        for idx in sorted(active, key=SERP_RANK.__getitem__):
             seg = self.belts[idx]
             if not seg:
+                active.discard(idx)
                 continue
-            seg.sort(key=lambda m: m.pos, reverse=True)
-            leader = seg[0]
+            it = iter(seg)
+            leader = next(it)
             target = leader.pos + sp * DT
             leader.pos = target if allow_exit else min(target, BELT_LEN_M)
-            for i in range(1, len(seg)):
+            ahead = leader.pos
+            for m in it:
                 if ignore_gaps:
-                    seg[i].pos = max(0.0, seg[i].pos + sp * DT)
+                    m.pos = max(0.0, m.pos + sp * DT)
                 else:
-                    ahead = seg[i-1]
-                    max_pos = ahead.pos - GAP
+                    max_pos = ahead - GAP
                     if not allow_exit:
                         max_pos = min(max_pos, BELT_LEN_M)
-                    seg[i].pos = max(0.0, min(seg[i].pos + sp * DT, max_pos))
+                    m.pos = max(0.0, min(m.pos + sp * DT, max_pos))
+                ahead = m.pos
             if allow_exit:
-                keep = []
-                for m in seg:
-                    if m.pos >= BELT_LEN_M - 1e-9:
-                        self.line2.append(Moving(
-                            m.id, "L2", 0.0, LINE2_LEN_M, self._speed_for("L2"),
-                            created_at=m.created_at, entered_area_at=self.t
-                        ))
-                    else:
-                        keep.append(m)
-                self.belts[idx] = keep
+                while seg and seg[0].pos >= BELT_LEN_M - 1e-9:
+                    m = seg.popleft()
+                    self.line2.append(self._transfer(m, SEG_L2, 0.0, self._speed_for("L2"), EV_BELT_L2))
 
     def _step_line2(self):
         if not self.line2:
             return
-        for m in self.line2:
-            m.speed = self._speed_for("L2")
-            m.step(DT)
-        arrived = [m for m in self.line2 if m.done]
-        if not arrived:
-            return
-        ids = {m.id for m in arrived}
-        self.line2 = [m for m in self.line2 if m.id not in ids]
-        for m in arrived:
+        for m in self.line2.step(self._speed_for("L2"), DT):
             if (self.rr % 2) == 0:
-                self.unl1.append(Moving(
-                    m.id, "U1", 0.0, UNL_LEN_M, self._speed_for("U1"),
-                    created_at=m.created_at, entered_area_at=self.t
-                ))
+                self.unl1.append(self._transfer(m, SEG_U1, 0.0, self._speed_for("U1"), EV_L2_UNL))
             else:
-                self.unl2.append(Moving(
-                    m.id, "U2", 0.0, UNL_LEN_M, self._speed_for("U2"),
-                    created_at=m.created_at, entered_area_at=self.t
-                ))
+                self.unl2.append(self._transfer(m, SEG_U2, 0.0, self._speed_for("U2"), EV_L2_UNL))
             self.rr += 1
 
     def _step_unloads(self):
-        if self.unl1:
-            for m in self.unl1:
-                m.speed = self._speed_for("U1")
-                m.step(DT)
-            done = [m for m in self.unl1 if m.done]
-            if done:
-                self.unl1 = [m for m in self.unl1 if m not in done]
-                for m in done:
-                    self.done_log.append(m.id)
-                    if self.on_unloaded:
-                        try:
-                            self.on_unloaded(m.id, "U1", self.t)
-                        except Exception:
-                            pass
-        if self.unl2:
-            for m in self.unl2:
-                m.speed = self._speed_for("U2")
-                m.step(DT)
-            done = [m for m in self.unl2 if m.done]
+        for line, name in ((self.unl1, "U1"), (self.unl2, "U2")):
+            if not line:
+                continue
+            done = line.step(self._speed_for(name), DT)
             if done:
-                self.unl2 = [m for m in self.unl2 if m not in done]
-                for m in done:
-                    self.done_log.append(m.id)
-                    if self.on_unloaded:
-                        try:
-                            self.on_unloaded(m.id, "U2", self.t)
-                        except Exception:
-                            pass
+                ids = [m.id for m in done]
+                for iid in ids:
+                    self._release(iid)
+                self._record_unloads(ids, name)
+
+    def _release(self, iid: int):
+        code = self.meta.barcode[iid]
+        if self.by_barcode.get(code) == iid:
+            del self.by_barcode[code]
+        self.index[iid] = None
+        self.meta.release(iid)
+
+    def _record_unloads(self, ids: List[int], name: str):
+        self.done_log.extend(ids)
+        self._count_unloads(len(ids), name)
+        if self.bus is not None:
+            self.bus.emit_many(EV_UNLOAD, self.t, ids, SEG_U1 if name == "U1" else SEG_U2, SEG_DONE)
+        if self.on_unloaded:
+            for iid in ids:
+                try:
+                    self.on_unloaded(iid, name, self.t)
+                except Exception:
+                    pass
+        if self.on_unloaded_batch is None:
+            return
+        # pencere tick cinsinden; olay motoru da ayni sinirlarda boler
+        k = self.k
+        if self._unload_buf and k - 1 - self._unload_k0 >= self._unload_window_ticks():
+            self.flush_unloads()
+        if not self._unload_buf:
+            self._unload_k0 = k
+        t = self.t
+        self._unload_buf.extend((iid, name, t) for iid in ids)
+
+    def _count_unloads(self, k: int, name: str):
+        self.occ[SEG_U1 if name == "U1" else SEG_U2] -= k
+
+    def _unload_window_ticks(self) -> int:
+        # bir partinin kapsadigi ek tick sayisi: pencere <= DT ise her tick ayri
+        return max(0, round(self.unload_window_s / DT) - 1)
+
+    def _flush_unloads_due(self):
+        if self._unload_buf and self.k - self._unload_k0 >= self._unload_window_ticks():
+            self.flush_unloads()
+
+    def flush_unloads(self):
+        # pencere dolmadan bekleyenleri hemen teslim et (or. kosu sonunda)
+        buf, self._unload_buf = self._unload_buf, []
+        if buf and self.on_unloaded_batch:
+            try:
+                self.on_unloaded_batch(buf)
+            except Exception:
+                pass
+
+    def enable_profiling(self, every_s: Optional[float] = None):
+        from profiler import TickProfiler
+        if self.profiler is None:
+            self.profiler = TickProfiler(self, every_s)
+        else:
+            self.profiler.set_every(every_s)
+        self.profiler.attach()
+        return self.profiler
+
+    def disable_profiling(self):
+        # toplanan veri self.profiler'da okunabilir kalir
+        if self.profiler is not None:
+            self.profiler.detach()
+
+    def _load_items(self) -> int:
+        return sum(self.occ[s] for s in SEG_LOADS)
+
+    def _belt_items(self) -> int:
+        return self.in_belts
+
+    def _at_tick(self, k: int):
+        self.k = k
+        self.t = k * DT
 
     def _spawn(self):
         return
 
     def tick(self):
-        self.t += DT
+        if self.commands is not None:
+            self.commands.drain(self)
+        self._at_tick(self.k + 1)
+        if self.mode == "DRAIN":
+            self._retune_drain()
         self._spawn()
         self._step_load_loop()
         self._step_belts()
         self._step_line2()
         self._step_unloads()
+        if self._unload_buf:
+            self._flush_unloads_due()
 
-    def snapshot(self) -> Dict[str, int | float]:
-        belts_q = sum(len(self.belts[b]) for b in self.belts)
-        return {
+    def run_events(self, seconds: float):
+        from events import run_events
+        if not TOPOLOGY.simple:
+            # olay motoru tek dongulu yerlesimi modeller
+            for _ in range(int(round(seconds / DT))):
+                self.tick()
+        else:
+            run_events(self, seconds)
+        self._flush_unloads_due()
+
+    def advance(self, seconds: float):
+        from events import advance_hang, run_events
+        n = int(round(seconds / DT))
+        if self.commands is not None and n >= ADVANCE_MIN_TICKS:
+            # olay motoru tick atlar: bekleyen komutlar yalnizca aralik basinda uygulanir
+            self.commands.drain(self)
+        if n < ADVANCE_MIN_TICKS or not TOPOLOGY.simple:
+            # kisa araliklarda olay kurulumu tick'ten pahali
+            for _ in range(n):
+                self.tick()
+        elif self.mode != "HANG":
+            run_events(self, n * DT)
+        else:
+            advance_hang(self, n, self.k)
+        self._flush_unloads_due()
+
+    def checkpoint(self) -> bytes:
+        from checkpoint import dump
+        return dump(self)
+
+    @classmethod
+    def restore(cls, data: bytes) -> "ConveyorSystem":
+        from checkpoint import load
+        return load(data)
+
+    def _segments_state(self) -> Dict[str, object]:
+        st = {
+            "load": self.load_loop.get_state(),
+            "belts": {b: seg.get_state() for b, seg in self.belts.items() if seg},
+            "l1": pack_items(self.line1),
+            "l2": self.line2.get_state(),
+            "u1": self.unl1.get_state(),
+            "u2": self.unl2.get_state(),
+        }
+        if len(self.load_loops) > 1:
+            st["load_extra"] = [loop.get_state() for loop in self.load_loops[1:]]
+        return st
+
+    def _set_segments_state(self, st: Dict[str, object]):
+        self.load_loop.set_state(st["load"])
+        for loop, ls in zip(self.load_loops[1:], st.get("load_extra", ())):
+            loop.set_state(ls)
+        for b, seg in self.belts.items():
+            seg.clear()
+            if b in st["belts"]:
+                seg.set_state(st["belts"][b])
+        self.line1 = unpack_items(st["l1"])
+        self.line2.set_state(st["l2"])
+        self.unl1.set_state(st["u1"])
+        self.unl2.set_state(st["u2"])
+        self._recount()
+        self._reindex()
+
+    def _reindex(self):
+        items = chain((m for loop in self.load_loops for _, _, m in loop.entries()), self.line1,
+                      *self.belts.values(), self.line2, self.unl1, self.unl2)
+        index: List[Optional[Moving]] = [None] * max(self.next_id, 1)
+        for m in items:
+            index[m.id] = m
+        self.index = index
+        barcode = self.meta.barcode
+        self.by_barcode = {barcode[iid]: iid for iid, m in enumerate(index) if m is not None}
+
+    def _recount(self):
+        occ = self.occ
+        for s in range(N_SEGS):
+            occ[s] = 0
+        for s, loop in self._loop_of.items():
+            occ[s] = len(loop)
+        occ[SEG_L1] = len(self.line1)
+        occ[SEG_L2] = len(self.line2)
+        occ[SEG_U1] = len(self.unl1)
+        occ[SEG_U2] = len(self.unl2)
+        for b, seg in self.belts.items():
+            occ[b] = len(seg)
+        self.in_belts = sum(occ[b] for b in self.belts)
+        self._active = {b for b in self.belts if occ[b]}
+
+    def belt_occupancy(self) -> List[int]:
+        # bant no b -> [b - 1]
+        return self.occ[1:BELTS_R * BELTS_C + 1].tolist()
+
+    def snapshot(self, per_belt: bool = False) -> Dict[str, object]:
+        occ = self.occ
+        snap = {
             "mode": self.mode,
             "t": self.t,
-            "in_load": len(self.load_loop),
-            "in_belts": belts_q,
-            "in_l1": len(self.line1),
-            "in_l2": len(self.line2),
-            "in_u1": len(self.unl1),
-            "in_u2": len(self.unl2),
+            "in_load": sum(occ[s] for s in SEG_LOADS),
+            "in_belts": self.in_belts,
+            "in_l1": occ[SEG_L1],
+            "in_l2": occ[SEG_L2],
+            "in_u1": occ[SEG_U1],
+            "in_u2": occ[SEG_U2],
             "done": len(self.done_log),
         }
+        if per_belt:
+            snap["belts"] = self.belt_occupancy()
+        return snap
+
+    def lookup(self, iid: int) -> Optional[Dict[str, object]]:
+        m = self.index[iid] if 0 < iid < len(self.index) else None
+        if m is None:
+            return None
+        # dongu ve hatlarda m.pos goreli; gercek konum segmentten (O(1))
+        lines = {SEG_L2: self.line2, SEG_U1: self.unl1, SEG_U2: self.unl2}
+        line = lines[m.seg] if m.seg in lines else self._loop_of.get(m.seg)
+        return {
+            "id": iid,
+            "barcode": self.meta.barcode[iid],
+            "seg": seg_name(m.seg),
+            "pos": m.pos if line is None else line.pos_of(m),
+            "created_at": self.meta.created_at[iid],
+            "entered_area_at": self.meta.entered_area_at[iid],
+        }
+
+    def _put(self, i0: int, items: List[Moving]):
+        index = self.index
+        end = i0 + len(items)
+        if end > len(index):
+            index.extend(repeat(None, end - len(index)))
+        index[i0:end] = items
+
+    def find_barcode(self, barcode: str) -> Optional[Dict[str, object]]:
+        # ayni barkod tekrar okunduysa en son eklenen item
+        iid = self.by_barcode.get(barcode)
+        return None if iid is None else self.lookup(iid)
 
     def add_item_from_barcode(self, barcode: str, station: int = 1):
-        self.load_loop.append(
-            Moving(
-                self.next_id,
-                "LOAD",
-                STATION_POS_M.get(station, 10.0) % LOAD_LOOP_LEN_M,
-                LOAD_LOOP_LEN_M,
-                SPEED_COLLECT,
-                wrap=True,
-                created_at=self.t,
-                entered_area_at=self.t,
-                barcode=barcode
-            )
-        )
+        self.meta.add(self.next_id, self.t, barcode)
+        i, pos = TOPOLOGY.station(station)
+        loop = self.load_loops[i]
+        m = Moving(self.next_id, SEG_LOADS[i], pos, SPEED_COLLECT)
+        loop.append(m)
+        self._put(m.id, [m])
+        self.by_barcode[barcode] = m.id
         self.next_id += 1
-        print(f"[OK] Barkod {barcode} sisteme eklendi. in_load: {len(self.load_loop)}")
+        self.occ[m.seg] += 1
+        self.log.info("barcode_added", "[OK] Barkod {barcode} sisteme eklendi. in_load: {in_load}",
+                      barcode=barcode, in_load=len(loop))
+
+    def add_items_from_barcodes(self, barcodes: Iterable[str], station: int = 1) -> List[int]:
+        # yeniden baslatma sonrasi okuyucu patlamasi: id blogu ayir, tek seferde ekle
+        codes = list(barcodes)
+        n = len(codes)
+        if not n:
+            return []
+        ids = range(self.next_id, self.next_id + n)
+        i, pos = TOPOLOGY.station(station)
+        loop, seg = self.load_loops[i], SEG_LOADS[i]
+        self.meta.add_many(ids.start, self.t, codes)
+        items = list(map(Moving, ids, repeat(seg, n), repeat(pos, n), repeat(SPEED_COLLECT, n)))
+        loop.extend_at(pos, items)
+        self._put(ids.start, items)
+        self.by_barcode.update(zip(codes, ids))
+        self.next_id += n
+        self.occ[seg] += n
+        self.log.info("barcodes_added", "[OK] {n} barkod sisteme eklendi. in_load: {in_load}",
+                      n=n, in_load=len(loop))
+        return list(ids)
@@ -0,0 +1,106 @@
+import copy
+import json
+import os
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from ordering import serpentine_order
+
+# Tesis yerlesimi dosyadan okunur ve motorun dogrudan kullandigi indeks
+# tablolarina derlenir. Segment kimlikleri: 0 = ilk yukleme dongusu,
+# 1..N = bantlar, sonra L1, L2, U1, U2, sonra ek yukleme donguleri.
+# Dosya: CONVEYOR_TOPOLOGY ortam degiskeni, yoksa topologies/default.json.
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PATH = os.path.join(HERE, "topologies", "default.json")
+
+
+class Loop(NamedTuple):
+    seg: int
+    length: float
+    switch_pos: float
+    feeds: Tuple[int, ...]      # varis sirasiyla beslenen bantlar (round robin)
+
+
+class Topology:
+    def __init__(self, spec: Dict[str, object]):
+        self.name = spec.get("name", "")
+        belts = spec["belts"]
+        self.rows, self.cols = int(belts["rows"]), int(belts["cols"])
+        self.n_belts = self.rows * self.cols
+        self.belt_len_m = float(belts["length_m"])
+        order = belts.get("order", "serpentine")
+        self.belt_order: Tuple[int, ...] = tuple(
+            serpentine_order(self.rows, self.cols) if order == "serpentine" else order)
+        if sorted(self.belt_order) != list(range(1, self.n_belts + 1)):
+            raise ValueError("topoloji: bant sirasi 1..N'in bir permutasyonu olmali")
+        # bant no -> tick icindeki sira
+        self.belt_rank = [0] * (self.n_belts + 1)
+        for rank, b in enumerate(self.belt_order):
+            self.belt_rank[b] = rank
+
+        self.line2_m = float(spec["line2_m"])
+        self.unload_m = float(spec["unload_m"])
+        n = self.n_belts
+        self.seg_l1, self.seg_l2, self.seg_u1, self.seg_u2 = n + 1, n + 2, n + 3, n + 4
+
+        loops = spec["load_loops"]
+        if not loops:
+            raise ValueError("topoloji: en az bir yukleme dongusu gerekli")
+        self.loops: List[Loop] = []
+        # istasyon -> (dongu indeksi, konum)
+        self.stations: Dict[int, Tuple[int, float]] = {}
+        for i, lp in enumerate(loops):
+            seg = 0 if i == 0 else n + 4 + i
+            length = float(lp["length_m"])
+            self.loops.append(Loop(seg, length, float(lp["switch_pos_m"]), self._feeds(lp)))
+            for st, pos in lp.get("stations", {}).items():
+                if int(st) in self.stations:
+                    raise ValueError(f"topoloji: istasyon {st} iki dongude tanimli")
+                self.stations[int(st)] = (i, float(pos) % length)
+        self.load_segs = tuple(lp.seg for lp in self.loops)
+        self.n_segs = max(self.load_segs[-1], self.seg_u2) + 1
+
+    def _feeds(self, lp: Dict[str, object]) -> Tuple[int, ...]:
+        # "feeds": [ilk, son] araligi bant sirasinda suzulur; "feed_order": acik liste
+        if "feed_order" in lp:
+            out = tuple(lp["feed_order"])
+        elif "feeds" in lp:
+            lo, hi = lp["feeds"]
+            out = tuple(b for b in self.belt_order if lo <= b <= hi)
+        else:
+            out = self.belt_order
+        if not out or not all(1 <= b <= self.n_belts for b in out):
+            raise ValueError(f"topoloji: gecersiz besleme {lp.get('feeds') or lp.get('feed_order')!r}")
+        return out
+
+    @property
+    def simple(self) -> bool:
+        # olay ve numpy motorlari: tek dongu, tum bantlari bant sirasiyla besler
+        return len(self.loops) == 1 and self.loops[0].feeds == self.belt_order
+
+    def with_loop(self, i: int, length: Optional[float] = None, switch_pos: Optional[float] = None,
+                  stations: Optional[Dict[int, float]] = None) -> "Topology":
+        # ayni yerlesim; i. dongunun uzunlugu, makas konumu ya da istasyonlari degismis kopya
+        lp = self.loops[i]
+        length = lp.length if length is None else float(length)
+        if stations is None:
+            stations = {st: pos for st, (j, pos) in self.stations.items() if j == i}
+        out = copy.copy(self)
+        out.loops = list(self.loops)
+        out.loops[i] = lp._replace(length=length,
+                                   switch_pos=lp.switch_pos if switch_pos is None else float(switch_pos))
+        out.stations = {st: v for st, v in self.stations.items() if v[0] != i}
+        for st, pos in stations.items():
+            if st in out.stations:
+                raise ValueError(f"topoloji: istasyon {st} iki dongude tanimli")
+            out.stations[st] = (i, float(pos) % length)
+        return out
+
+    def station(self, station: int) -> Tuple[int, float]:
+        # tanimsiz istasyon: ilk dongude 10 m (eski davranis)
+        return self.stations.get(station, (0, 10.0 % self.loops[0].length))
+
+
+def load_topology(path: Optional[str] = None) -> Topology:
+    with open(path or DEFAULT_PATH, encoding="utf-8") as f:
+        return Topology(json.load(f))
@@ -0,0 +1,9 @@
+import os
+import sys
+
+# conveyor_sim modulleri birbirini duz adla import eder
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "conveyor_sim"))
+
+import logsink  # noqa: E402
+
+logsink.LOG.set_level(logsink.OFF)
@@ -0,0 +1,38 @@
+import builtins
+import pickle
+
+import pytest
+
+from checkpoint import MAGIC, VERSION, _HEADER
+from system import ConveyorSystem
+
+
+class _Evil:
+    def __reduce__(self):
+        return exec, ("import builtins; builtins._checkpoint_pwned = True",)
+
+
+def test_load_rejects_globals_without_running_them():
+    data = _HEADER.pack(MAGIC, VERSION) + pickle.dumps({"engine": _Evil()}, protocol=5)
+    with pytest.raises(ValueError):
+        ConveyorSystem.restore(data)
+    assert not hasattr(builtins, "_checkpoint_pwned")
+
+
+@pytest.mark.parametrize("engine", ["list", "numpy"])
+def test_round_trip_uses_only_plain_values(engine):
+    s = ConveyorSystem(engine, seed=2)
+    for k in range(600):
+        if k % 3 == 0:
+            s.add_item_from_barcode(f"BC{s.next_id:04d}", station=1 + k % 4)
+        if k == 300:
+            s.pick_and_hang()
+        s.tick()
+    s.toggle_mode()
+    s.tick()
+    r = ConveyorSystem.restore(s.checkpoint())
+    for _ in range(1500):
+        s.tick()
+        r.tick()
+    assert r.snapshot() == s.snapshot()
+    assert r.done_log == s.done_log
@@ -0,0 +1,79 @@
+import asyncio
+import io
+
+import pytest
+
+import runner
+from commands import CommandQueue, apply_key
+from logsink import INFO, LogSink
+from system import ConveyorSystem
+
+SCRIPT = ("b", "b", "b", "r", "p", "h", "b")
+
+
+def _console(s, chars):
+    # klavye yerine sabit tus dizisi; konsol yalnizca kuyruga yazar
+    async def fake_keys():
+        for ch in chars + ("q",):
+            yield ch
+
+    rr = runner.RealtimeRunner(s)
+    orig, runner.keys = runner.keys, fake_keys
+    try:
+        asyncio.run(runner.console(rr, station=2))
+    finally:
+        runner.keys = orig
+    return rr
+
+
+def _state(s):
+    snap = s.snapshot()
+    return snap, sorted(s.by_barcode)
+
+
+@pytest.mark.parametrize("engine", ["list", "numpy"])
+def test_console_matches_headless_keys(engine):
+    direct = ConveyorSystem(engine, seed=3)
+    queued = ConveyorSystem(engine, seed=3)
+    queued.commands = CommandQueue(journal=True)
+    rr = _console(queued, SCRIPT)
+    assert rr.stopped.is_set()
+    assert queued.commands.pending() == len(SCRIPT)
+    queued.tick()
+    assert [(name, args) for _, name, args in queued.commands.journal] == [("key", (ch, 2)) for ch in SCRIPT]
+    assert queued.commands.failed == 0
+
+    for ch in SCRIPT:
+        apply_key(direct, ch, station=2)
+    direct.tick()
+    assert _state(queued) == _state(direct)
+    assert sorted(direct.by_barcode)[:2] == ["BC0001", "BC0002"]
+
+
+def test_key_feedback_is_logged():
+    s = ConveyorSystem(seed=1)
+    buf = io.StringIO()
+    s.log = LogSink(buf, INFO)
+    s.commands = CommandQueue()
+    for ch in ("r", "h"):
+        s.commands.submit("key", ch, 1)
+    s.tick()
+    s.log.flush()
+    out = buf.getvalue()
+    assert "-> Mode: DRAIN" in out
+    assert "-> Mode: HANG" in out
+
+
+def test_unknown_key_rejected():
+    with pytest.raises(ValueError):
+        CommandQueue().submit("key", "x", 1)
+
+
+def test_journal_is_opt_in():
+    s = ConveyorSystem(seed=1)
+    rr = runner.RealtimeRunner(s)
+    assert rr.sys.commands.journal is None
+    s.commands.submit("add_many", [f"X{j}" for j in range(50)], 1)
+    s.tick()
+    assert s.commands.applied == 1
+    assert s.commands.journal is None
@@ -0,0 +1,58 @@
+import pytest
+
+from system import ConveyorSystem
+
+
+def _run(engine: str, until: int, fast: bool = False) -> ConveyorSystem:
+    # 1200. tick'te DRAIN: LIFO ile herkes L2'ye, sonra U1/U2'ye akar
+    s = ConveyorSystem(engine, seed=5)
+    for st in (1, 2, 3, 4):
+        s.add_items_from_barcodes((f"L{st}-{j}" for j in range(60)), st)
+    if fast:
+        s.advance(50.0)
+    else:
+        for _ in range(500):
+            s.tick()
+    s.pick_and_hang()
+    for _ in range(s.k, min(until, 1200)):
+        s.tick()
+    if until > 1200:
+        s.toggle_mode()
+        for _ in range(until - 1200):
+            s.tick()
+    return s
+
+
+def _where(s: ConveyorSystem):
+    out = {}
+    for iid in range(1, s.next_id):
+        r = s.lookup(iid)
+        if r is not None:
+            out[iid] = (r["seg"], r["pos"])
+    return out
+
+
+@pytest.mark.parametrize("until", [600, 1260, 1300])
+def test_lookup_positions_match_across_engines(until):
+    ref = _where(_run("list", until))
+    assert ref
+    for other in (_where(_run("numpy", until)), _where(_run("list", until, fast=True))):
+        assert other.keys() == ref.keys()
+        for iid, (seg, pos) in ref.items():
+            assert other[iid][0] == seg
+            assert other[iid][1] == pytest.approx(pos, abs=1e-6)
+
+
+def test_lookup_on_lines_tracks_the_line():
+    s = _run("list", 1260)
+    on_lines = {iid: w for iid, w in _where(s).items() if w[0] in ("L2", "U1", "U2")}
+    assert on_lines
+    # hat uzerinde gezinmek (sync) gercek konumlari m.pos'a yazar
+    real = {m.id: m.pos for line in (s.line2, s.unl1, s.unl2) for m in line}
+    assert {iid: pos for iid, (_, pos) in on_lines.items()} == pytest.approx(real)
+
+
+def test_lookup_survives_checkpoint():
+    for engine in ("list", "numpy"):
+        s = _run(engine, 1260)
+        assert _where(ConveyorSystem.restore(s.checkpoint())) == _where(s)
@@ -0,0 +1,58 @@
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from montecarlo import Scenario, run_scenario
+
+
+def _scenario(engine: str = "list", **overrides) -> Scenario:
+    return Scenario(seed=3, duration_s=600.0, rates=(0.2,) * 4, arrivals_until_s=300.0,
+                    schedule=[(300.0, "toggle")], overrides=overrides, engine=engine)
+
+
+def _kpis(r):
+    return {k: v for k, v in r.items() if k != "wall_s"}
+
+
+def _in_fresh_worker(*scenarios):
+    # ayni isci surecinde sirayla; spawn: ebeveynin import ettikleri tasinmaz
+    with ProcessPoolExecutor(max_workers=1, mp_context=mp.get_context("spawn")) as pool:
+        return [_kpis(pool.submit(run_scenario, sc).result()) for sc in scenarios]
+
+
+@pytest.mark.parametrize("engine", ["list", "numpy"])
+def test_override_does_not_leak_into_next_scenario_in_same_worker(engine):
+    plain, = _in_fresh_worker(_scenario(engine))
+    patched, after = _in_fresh_worker(_scenario(engine, LINE2_LEN_M=60.0), _scenario(engine))
+    assert patched != plain
+    assert after == plain
+
+
+@pytest.mark.parametrize("overrides", [
+    {"LOAD_LOOP_LEN_M": 240.0},
+    {"SW_POS_M": 20.0},
+    {"STATION_POS_M": {1: 50.0, 2: 55.0, 3: 70.0, 4: 100.0}},
+    {"LINE2_LEN_M": 60.0},
+])
+def test_loop_overrides_reach_both_engines(overrides):
+    plain = _kpis(run_scenario(_scenario()))
+    by_engine = [_kpis(run_scenario(_scenario(e, **overrides))) for e in ("list", "numpy")]
+    for r in by_engine:
+        r.pop("engine")
+    assert by_engine[0] == by_engine[1]
+    assert by_engine[0] != {k: v for k, v in plain.items() if k != "engine"}
+
+
+def test_layout_names_cannot_be_overridden():
+    with pytest.raises(ValueError):
+        run_scenario(_scenario(BELTS_R=8))
+
+
+@pytest.mark.parametrize("engine", ["list", "numpy"])
+@pytest.mark.parametrize("dt", [0.05, 0.2])
+def test_dt_override_keeps_sim_time(engine, dt):
+    sc = _scenario(engine, DT=dt)
+    r = run_scenario(sc)
+    assert r["t_end"] == pytest.approx(sc.duration_s)
+    assert r["arrived"] == _kpis(run_scenario(_scenario(engine)))["arrived"]
@@ -0,0 +1,27 @@
+import pytest
+
+from system import ConveyorSystem
+
+
+def _drain_after(engine, seed, hang):
+    s = ConveyorSystem(engine, seed=seed)
+    for k in range(600):
+        if k % 2 == 0:
+            s.add_item_from_barcode(f"BC{s.next_id:04d}", station=1 + k % 4)
+        if k == 400:
+            s.pick_and_hang()
+        s.tick()
+    # ayni tick'te askiya al ve bosalt: item'lar ayni entered_area_at'i paylasir
+    getattr(s, hang)()
+    s.toggle_mode()
+    for _ in range(3000):
+        s.tick()
+    return s.done_log
+
+
+@pytest.mark.parametrize("seed", [9, 13, 21])
+@pytest.mark.parametrize("hang", ["_enter_hang", "pick_and_hang"])
+def test_toggle_right_after_hang_matches_engines(seed, hang):
+    done = _drain_after("list", seed, hang)
+    assert done
+    assert _drain_after("numpy", seed, hang) == done
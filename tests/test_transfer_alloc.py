@@ -0,0 +1,74 @@
+import tracemalloc
+from itertools import chain
+
+import pytest
+
+from system import ConveyorSystem
+
+# Segment gecisleri Moving kaydini yerinde yeniden etiketler. Item'lar
+# izleme baslamadan eklenir; sonrasinda canli bir kaydin tracemalloc
+# geri izi varsa gecis sirasinda yeni Moving kurulmustur.
+
+
+def _live(s):
+    return chain((m for loop in s.load_loops for _, _, m in loop.entries()), s.line1,
+                 *s.belts.values(), s.line2, s.unl1, s.unl2)
+
+
+def _new_records(s) -> int:
+    return sum(tracemalloc.get_object_traceback(m) is not None for m in _live(s))
+
+
+@pytest.fixture
+def traced():
+    tracemalloc.start()
+    yield
+    tracemalloc.stop()
+
+
+def _loaded(n: int = 400) -> ConveyorSystem:
+    s = ConveyorSystem(seed=1)
+    for st in (1, 2, 3, 4):
+        s.add_items_from_barcodes((f"T{st}-{j}" for j in range(n // 4)), st)
+    return s
+
+
+def test_detects_allocations(traced):
+    s = ConveyorSystem(seed=1)
+    s.add_items_from_barcodes(["A", "B"], 1)
+    assert _new_records(s) == 2
+
+
+def test_collect_drain_ticks_allocate_no_records(traced):
+    tracemalloc.stop()
+    s = _loaded()
+    tracemalloc.start()
+    new = 0
+    for k in range(1, 1201):
+        s.tick()
+        if k % 20 == 0:
+            new = max(new, _new_records(s))
+    assert s.in_belts == 400
+    s.toggle_mode()
+    while len(s.done_log) < 400:
+        s.tick()
+        if s.k % 5 == 0:
+            new = max(new, _new_records(s))
+    assert new == 0
+
+
+def test_hang_and_event_drain_allocate_no_records(traced):
+    tracemalloc.stop()
+    s = _loaded()
+    tracemalloc.start()
+    s.advance(60.0)
+    s.pick_and_hang()
+    s.advance(60.0)
+    s.set_mode("HANG")
+    s.advance(3600.0)
+    assert _new_records(s) == 0
+    s.toggle_mode()
+    s.advance(5.0)
+    assert _new_records(s) == 0
+    s.advance(900.0)
+    assert len(s.done_log) == 400